@@ -0,0 +1,130 @@
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many candidates a single process is faster than starting workers
+PARALLEL_MIN_CANDIDATES = 20000
+
+
+def event_seed(event_id, draw_number=0):
+    """Stable default seed for the `draw_number`-th draw of an event.
+
+    The same event id always starts from the same draw, and each redraw
+    within the event gets its own seed in the draw log.
+    """
+    digest = hashlib.sha256(f"{event_id}#{draw_number}".encode("utf-8")).hexdigest()
+    return int(digest[:12], 16)
+
+
+def allocate_groups_random(members_list, max_group_size, seed=None):
+    """Randomly allocate members to groups of approximately equal size.
+
+    Members are sorted before shuffling with a `random.Random(seed)`, so
+    the same seed and member set always produce the same groups.
+    """
+    members_list = sorted(members_list)
+    random.Random(seed).shuffle(members_list)
+
+    groups = [members_list[i:i+max_group_size] for i in range(0, len(members_list), max_group_size)]
+
+    # If last group has fewer than max_group_size members and there's an extra group, balance them
+    if len(groups) > 1 and len(groups[-1]) < max_group_size:
+        extra_members = groups.pop()
+        for i, member in enumerate(extra_members):
+            groups[i % len(groups)].append(member)
+
+    return groups
+
+
+def balance_metrics(groups, genders):
+    """How uneven a draw is; lower is better.
+
+    - size spread: largest minus smallest group
+    - gender spread: summed distance of each group's share of the more
+      common gender from the share across all players
+    """
+    players = [player for group in groups for player in group]
+    if not players:
+        return {"score": 0.0, "size_spread": 0, "gender_spread": 0.0}
+    main_gender = max(set(genders.get(p) for p in players),
+                      key=lambda g: sum(genders.get(p) == g for p in players))
+    overall_share = sum(genders.get(p) == main_gender for p in players) / len(players)
+    gender_spread = sum(abs(sum(genders.get(p) == main_gender for p in group) / len(group) - overall_share)
+                        for group in groups if group)
+    size_spread = max(len(group) for group in groups) - min(len(group) for group in groups)
+    return {"score": round(size_spread + gender_spread, 4), "size_spread": size_spread,
+            "gender_spread": round(gender_spread, 4)}
+
+
+def _best_in_seed_range(args):
+    # Worker: score every seed in [start, stop) and keep the local top N
+    members_list, max_group_size, genders, start, stop, top_n = args
+    return heapq.nsmallest(top_n, (
+        (balance_metrics(allocate_groups_random(members_list, max_group_size, seed), genders)["score"], seed)
+        for seed in range(start, stop)
+    ))
+
+
+def best_draws(members_list, max_group_size, genders, base_seed, candidates=2000, top_n=5, workers=None):
+    """Score `candidates` draws (seeds base_seed .. base_seed+candidates-1) and return the top N.
+
+    Seed ranges are split across worker processes; each returns its own
+    top N and only those are merged, so the result is identical whatever
+    the number of workers. Returns [(score, seed, groups), ...], best first.
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if candidates >= PARALLEL_MIN_CANDIDATES else 1
+    chunk = -(-candidates // workers)
+    tasks = [(members_list, max_group_size, genders, start, min(start + chunk, base_seed + candidates), top_n)
+             for start in range(base_seed, base_seed + candidates, chunk)]
+    if workers == 1 or len(tasks) == 1:
+        results = map(_best_in_seed_range, tasks)
+    else:
+        # spawn rather than fork: the Streamlit server process is multi-threaded
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_best_in_seed_range, tasks))
+    best = heapq.nsmallest(top_n, (item for result in results for item in result))
+    return [(score, seed, allocate_groups_random(members_list, max_group_size, seed)) for score, seed in best]
+
+
+class DrawLog:
+    """Append-only record of every draw: seed, inputs, constraints and result"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, event_id, seed, members_list, constraints, groups, metrics, mode):
+        entry = {
+            "ts": time.time(),
+            "event": event_id,
+            "mode": mode,
+            "seed": seed,
+            "members": sorted(members_list),
+            "constraints": constraints,
+            "groups": groups,
+            "metrics": metrics,
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def entries(self, event_id=None):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        return [e for e in entries if event_id is None or e["event"] == event_id]
+
+    @staticmethod
+    def verify(entry):
+        """True if re-running the logged draw reproduces the logged groups"""
+        if entry["seed"] is None:
+            return None
+        return allocate_groups_random(entry["members"], entry["constraints"]["max_group_size"],
+                                      entry["seed"]) == entry["groups"]
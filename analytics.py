@@ -0,0 +1,189 @@
+import json
+import os
+import pickle
+import threading
+from collections import deque
+from itertools import combinations
+
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class HistoryEngine:
+    """Analytics over every archived monthly event.
+
+    Raw events are appended to `events.jsonl`; the rollup tables below are
+    updated incrementally as each event is appended and pickled next to
+    it, so a restart only replays events newer than the saved rollups and
+    queries never re-aggregate raw rows.
+
+    Player results are compared on strokes per hole so events with a
+    different number of rounds (or partial attendance) stay comparable.
+    """
+
+    def __init__(self, directory, window=3):
+        os.makedirs(directory, exist_ok=True)
+        self.events_path = os.path.join(directory, "events.jsonl")
+        self.rollups_path = os.path.join(directory, "rollups.pkl")
+        self.window = window
+        self._lock = threading.Lock()
+
+        self.events = []            # event ids in append order
+        self.series = {}            # player -> [(event index, strokes per hole), ...]
+        self.recent = {}            # player -> deque of the last `window` results
+        self.regression = {}        # player -> [n, sum x, sum y, sum xy, sum xx]
+        self.streaks = {}           # player -> [last event index, current streak, best streak]
+        self.holes = {}             # (course, hole) -> [plays, sum, sum of squares]
+        self.head_to_head = {}      # player -> {opponent: [wins, losses, ties]}
+        self._load()
+
+    @property
+    def version(self):
+        return len(self.events)
+
+    def _load(self):
+        if os.path.exists(self.rollups_path):
+            with open(self.rollups_path, "rb") as f:
+                self.__dict__.update(pickle.load(f))
+        if os.path.exists(self.events_path):
+            with open(self.events_path, encoding="utf-8") as f:
+                for index, line in enumerate(f):
+                    if index >= len(self.events):
+                        self._apply(json.loads(line))
+
+    def _save_rollups(self):
+        state = {key: getattr(self, key) for key in
+                 ("events", "series", "recent", "regression", "streaks", "holes", "head_to_head")}
+        with open(self.rollups_path + ".tmp", "wb") as f:
+            pickle.dump(state, f)
+        os.replace(self.rollups_path + ".tmp", self.rollups_path)
+
+    def append_event(self, event_id, scores=None, round_totals=None, holes_per_round=(9, 9, 9, 9), courses=None):
+        """Archive one event.
+
+        `scores` uses the score store layout (player -> round -> hole ->
+        score); `round_totals` (player -> {round number: total}) is for
+        older records that only kept round totals and feeds every rollup
+        except hole difficulty, assuming every round in them was played in
+        full (`holes_per_round`, from the event format). Each hole is
+        archived under the course its round was played on (`courses`, also
+        from the event format), so hole difficulty never mixes layouts.
+        Returns False if the event was already archived.
+        """
+        with self._lock:
+            if event_id in self.events:
+                return False
+            event = {"event": event_id, "players": {}, "holes": []}
+            courses = list(courses or [])
+            for player, rounds in (scores or {}).items():
+                hole_scores = [(_course(int(round_key.split("_")[1]), courses), int(hole_key.split("_")[1]), score)
+                               for round_key, holes in rounds.items()
+                               for hole_key, score in holes.items() if score is not None]
+                if hole_scores:
+                    event["players"][player] = [sum(s for _, _, s in hole_scores), len(hole_scores)]
+                    event["holes"].extend(hole_scores)
+            for player, totals in (round_totals or {}).items():
+                totals = {r: total for r, total in totals.items()
+                          if total is not None and total == total and r <= len(holes_per_round)}
+                if totals and player not in event["players"]:
+                    event["players"][player] = [sum(totals.values()),
+                                                sum(holes_per_round[r - 1] for r in totals)]
+            if not event["players"]:
+                return False
+
+            with open(self.events_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._apply(event)
+            self._save_rollups()
+            return True
+
+    def _apply(self, event):
+        x = len(self.events)
+        self.events.append(event["event"])
+        results = {player: strokes / holes for player, (strokes, holes) in event["players"].items()}
+
+        for player, y in results.items():
+            self.series.setdefault(player, []).append((x, y))
+            self.recent.setdefault(player, deque(maxlen=self.window)).append(y)
+            sums = self.regression.setdefault(player, [0, 0.0, 0.0, 0.0, 0.0])
+            sums[0] += 1
+            sums[1] += x
+            sums[2] += y
+            sums[3] += x * y
+            sums[4] += x * x
+            streak = self.streaks.setdefault(player, [None, 0, 0])
+            streak[1] = streak[1] + 1 if streak[0] == x - 1 else 1
+            streak[0] = x
+            streak[2] = max(streak[2], streak[1])
+
+        for course, hole_number, score in event["holes"]:
+            hole = self.holes.setdefault((course, hole_number), [0, 0.0, 0.0])
+            hole[0] += 1
+            hole[1] += score
+            hole[2] += score * score
+
+        for a, b in combinations(results, 2):
+            a_record = self.head_to_head.setdefault(a, {}).setdefault(b, [0, 0, 0])
+            b_record = self.head_to_head.setdefault(b, {}).setdefault(a, [0, 0, 0])
+            if results[a] < results[b]:
+                a_record[0] += 1
+                b_record[1] += 1
+            elif results[b] < results[a]:
+                a_record[1] += 1
+                b_record[0] += 1
+            else:
+                a_record[2] += 1
+                b_record[2] += 1
+
+    def member_trends(self):
+        """Per-member moving average, improvement slope and attendance streaks"""
+        latest = len(self.events) - 1
+        rows = []
+        for player, (n, sx, sy, sxy, sxx) in self.regression.items():
+            denominator = n * sxx - sx * sx
+            last_event, streak, best_streak = self.streaks[player]
+            rows.append({
+                "Player": player,
+                "Events": n,
+                "Last": round(self.series[player][-1][1], 2),
+                f"Moving Avg ({self.window})": round(sum(self.recent[player]) / len(self.recent[player]), 2),
+                # Strokes per hole gained per event; negative means improving
+                "Slope": round((n * sxy - sx * sy) / denominator, 3) if denominator else None,
+                "Current Streak": streak if last_event == latest else 0,
+                "Best Streak": best_streak,
+            })
+        return pd.DataFrame(rows)
+
+    def player_series(self, player):
+        return pd.DataFrame([(self.events[x], y) for x, y in self.series.get(player, [])],
+                            columns=["Event", "Strokes per Hole"])
+
+    def hole_difficulty(self):
+        """Historical average per hole and how far it sits above the field average"""
+        plays = sum(hole[0] for hole in self.holes.values())
+        field_avg = sum(hole[1] for hole in self.holes.values()) / plays if plays else 0
+        rows = []
+        for (course, hole_number), (n, total, squares) in sorted(self.holes.items()):
+            mean = total / n
+            rows.append({
+                "Course": course,
+                "Hole": hole_number,
+                "Plays": n,
+                "Avg": round(mean, 2),
+                "Std Dev": round(max(squares / n - mean * mean, 0) ** 0.5, 2),
+                "vs Field": round(mean - field_avg, 2),
+            })
+        return pd.DataFrame(rows)
+
+    def head_to_head_for(self, player):
+        """Wins/losses/ties of `player` against everyone they have played alongside"""
+        rows = [[opponent] + record for opponent, record in self.head_to_head.get(player, {}).items()]
+        return pd.DataFrame(rows, columns=["Opponent", "Wins", "Losses", "Ties"])
+
+
+def _course(round_number, courses):
+    """Course a round was played on, or "Round N" when the format doesn't name one"""
+    if round_number <= len(courses) and courses[round_number - 1]:
+        return courses[round_number - 1]
+    return f"Round {round_number}"
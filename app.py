@@ -1,10 +1,130 @@
-import random
+import os
+import re
+import time
+import uuid
+from types import MappingProxyType
+from urllib.parse import urlencode
+
 import streamlit as st
-import pandas as pd
-import numpy as np
+from datetime import datetime
+
+from startup import StartupMetrics, lazy_import, prewarm
+
+# pandas is only imported when a section first needs it
+pd = lazy_import("pandas")
+
+from allocation import DrawLog, allocate_groups_random, balance_metrics, best_draws, event_seed
+from analytics import HistoryEngine
+from divisions import division_aggregates, division_labels, member_divisions
+from event_format import HOLE_OPTIONS, EventFormat
+from journal import ChangeJournal
+from leaderboard import build_leaderboard, calculate_stats, scores_frame, summarize_player
+from score_api import start_api_server
+from score_store import ScoreStore
+from sessions import SessionRegistry, deep_sizeof
+from teams import TEAM_FORMATS, TeamBoard
 
+run_started = time.time()
 st.set_page_config(layout="wide")
 
+@st.cache_resource
+def get_score_store():
+    # One score sheet shared by every session (phones, clubhouse display, ...)
+    store = ScoreStore(EventFormat.load("./event_format.json"))
+    store.attach_journal(ChangeJournal("./score_journal"))
+    return store
+
+@st.cache_data(max_entries=8)
+def cached_leaderboard(version, _store):
+    # Keyed on the store version only, so every display polling the same
+    # version shares one rendering and nothing is recomputed between changes
+    rows = build_leaderboard(_store.snapshot(), _store.event_format.par)
+    columns = (["Rank", "Player", "To Par", "Holes"]
+               + [f"Round {r} Total" for r in _store.event_format.round_numbers()] + ["Overall Total"])
+    return pd.DataFrame(rows, columns=columns)
+
+@st.cache_data(max_entries=8)
+def cached_scores_frame(version, _store):
+    # Long-format frame every grouped aggregation (divisions, groups) starts from
+    return scores_frame(_store.snapshot())
+
+@st.cache_data(max_entries=2)
+def cached_store_bytes(version, players, _store):
+    # Walking every cell takes a noticeable fraction of a second on a large
+    # event, so it is only redone when the sheet changed
+    return deep_sizeof(_store.snapshot())
+
+@st.cache_resource(max_entries=16)
+def get_team_board(teams, team_format, best_n, event_format):
+    # One board per team definition/format, shared by every session and
+    # updated incrementally by the score store on each hole change
+    board = TeamBoard(teams, team_format, best_n, event_format.rounds, event_format.max_holes,
+                      event_format.par)
+    get_score_store().subscribe(board)
+    return board
+
+@st.cache_resource
+def get_score_api():
+    # JSON API for scorer devices, served from the same process and score store
+    try:
+        return start_api_server(get_score_store(), port=int(os.environ.get("PARKGOLF_API_PORT", 8502)))
+    except OSError:
+        return None
+
+@st.cache_resource
+def get_history_engine():
+    # Rollups over every archived event, updated incrementally on append
+    return HistoryEngine("./history")
+
+@st.cache_data(max_entries=4)
+def cached_member_trends(version, _engine):
+    return _engine.member_trends()
+
+@st.cache_data(max_entries=4)
+def cached_hole_difficulty(version, _engine):
+    return _engine.hole_difficulty()
+
+def render_leaderboard_display():
+    """Read-only leaderboard for a clubhouse screen (?view=leaderboard&refresh=30)"""
+    try:
+        refresh_seconds = max(5, int(st.query_params.get("refresh", 30)))
+    except ValueError:
+        refresh_seconds = 30
+
+    st.title("Leader Board")
+
+    @st.fragment(run_every=refresh_seconds)
+    def leaderboard_fragment():
+        store = get_score_store()
+        # Cheap version check; the frame itself comes from the shared cache
+        version = store.version
+        board_df = cached_leaderboard(version, store)
+        if board_df.empty:
+            st.info("No scores have been entered yet.")
+        else:
+            st.dataframe(board_df, use_container_width=True, hide_index=True)
+        st.caption(f"Score version {version} · refreshes every {refresh_seconds}s")
+
+    leaderboard_fragment()
+
+def on_score_change(player, round_key, hole_key, group_index):
+    # Widget callbacks are the only path from the entry grid into the store,
+    # so a stale widget in one session never overwrites another session's edit
+    get_score_store().set_score(
+        player, round_key, hole_key,
+        st.session_state[f"{player}_{round_key}_{hole_key}"],
+        author=st.session_state.get("scorer_name") or None,
+        group=group_index,
+    )
+
+def undo_group(group_index):
+    if get_score_store().undo(group_index, author=st.session_state.get("scorer_name") or None) is False:
+        st.toast("Not undone: that hole was changed again after this group's edit.")
+
+def redo_group(group_index):
+    if get_score_store().redo(group_index, author=st.session_state.get("scorer_name") or None) is False:
+        st.toast("Not redone: that hole was changed again after the undo.")
+
 @st.cache_resource
 def load_members_from_excel():
     # Load the Excel file
@@ -14,65 +134,84 @@ def load_members_from_excel():
     for _, row in df.iloc[1:].iterrows():  # Skip the first row which is the title
         name = row["회원이름"]
         gender = row["성별"]
-        members[name] = {"available": True, "gender": gender}
-    return members
+        members[name] = MappingProxyType({"gender": gender,
+                                          "divisions": MappingProxyType(member_divisions(row))})
+    # Shared by every session, so it must never be mutated; sessions keep
+    # their own changes as deltas in a SessionRoster
+    return MappingProxyType(members)
+
+@st.cache_resource
+def get_session_registry():
+    return SessionRegistry(load_members_from_excel(), "./session_state")
 
-# Load members from the Excel file
-members = load_members_from_excel()
+@st.cache_resource
+def get_startup_metrics():
+    # Runs once per server process: warm the roster, history store and
+    # rating tables in the background while the first page renders
+    metrics = StartupMetrics()
 
-def allocate_groups_random(members_list):
-    """Randomly allocate members to groups of approximately equal size"""
-    random.shuffle(members_list)  # Shuffle the list randomly
-    
-    groups = [members_list[i:i+max_group_size] for i in range(0, len(members_list), max_group_size)]
-    
-    # If last group has fewer than 4 members and there's an extra group, balance them
-    if len(groups) > 1 and len(groups[-1]) < max_group_size:
-        extra_members = groups.pop()
-        for i, member in enumerate(extra_members):
-            groups[i % len(groups)].append(member)
-    
-    return groups
+    def warm_rating_tables():
+        engine = get_history_engine()
+        cached_member_trends(engine.version, engine)
+        cached_hole_difficulty(engine.version, engine)
+
+    prewarm({
+        "pandas": lambda: pd.DataFrame,
+        "roster": load_members_from_excel,
+        "score store": get_score_store,
+        "history store": get_history_engine,
+        "rating tables": warm_rating_tables,
+    }, metrics)
+    return metrics
+
+startup_metrics = get_startup_metrics()
 
-# Initialize score structure for a player
-def init_player_scores():
-    return {
-        "round_1": {f"hole_{i}": None for i in range(1, 10)},
-        "round_2": {f"hole_{i}": None for i in range(1, 10)},
-        "round_3": {f"hole_{i}": None for i in range(1, 10)},
-        "round_4": {f"hole_{i}": None for i in range(1, 10)}
-    }
+if st.query_params.get("view") == "leaderboard":
+    render_leaderboard_display()
+    st.stop()
 
 # Streamlit UI Setup
+# The shell (title and tabs) is drawn before anything touches the workbook
 st.title("Golf Group and Score Management")
+tab1, tab2, tab3, tab4 = st.tabs(["Group Allocation", "Score Collection","Leader Board","Track Record"])
+startup_metrics.record_first_paint(run_started)
 
 # Initialize session state
-if "members" not in st.session_state:
-    st.session_state.members = members
+# st.session_state only holds the session id (kept in the URL so an evicted
+# session can be restored) and widget values; members/groups live in the
+# session registry, scores in the shared score store
+if "sid" not in st.session_state:
+    sid = st.query_params.get("sid", "")
+    st.session_state.sid = sid if re.fullmatch(r"[0-9a-f]{12}", sid) else uuid.uuid4().hex[:12]
+    st.query_params["sid"] = st.session_state.sid
 
-if "groups" not in st.session_state:
-    st.session_state.groups = []
+with st.spinner("Loading member roster..."):
+    session_registry = get_session_registry()
+session = session_registry.checkout(st.session_state.sid)
+score_store = get_score_store()
+score_api = get_score_api()
 
-if "scores" not in st.session_state:
-    st.session_state.scores = {}
-    for member in st.session_state.members:
-        st.session_state.scores[member] = init_player_scores()
+def set_groups(groups):
+    # Score rows are only allocated for players that actually take part
+    session.groups = groups
+    for group in groups:
+        for player in group:
+            score_store.ensure_player(player)
 
-# Main tabs for app sections
-tab1, tab2, tab3, tab4 = st.tabs(["Group Allocation", "Score Collection","Leader Board","Track Record"])
+set_groups(session.groups)
 
 with tab1:
     # Tab for managing member details
     st.sidebar.title("Member List")
 
     with st.sidebar.expander("회원상세", expanded=True):
-        for member, data in st.session_state.members.items():
+        for member, data in session.members.items():
             col1, col2 = st.columns([3, 2])
             with col1:
                 st.markdown(f"#### {member}")
             with col2:
-                st.session_state.members[member]["available"] = st.checkbox(
-                    "참가", value=data["available"], key=f"avail_{member}")
+                session.members.set_available(member, st.checkbox(
+                    "참가", value=data["available"], key=f"avail_{member}"))
             # st.divider()
 
     # Sidebar for managing members
@@ -85,18 +224,34 @@ with tab1:
         new_member_gender = st.selectbox("Gender", ["Male", "Female"])
         
         if st.button("Add Member") and new_member:
-            if new_member not in st.session_state.members:
-                st.session_state.members[new_member] = {"available": True, "gender": new_member_gender}
-                st.session_state.scores[new_member] = init_player_scores()
+            if new_member not in session.members:
+                session.members.add(new_member, new_member_gender)
         
         # Remove members
-        to_remove = st.multiselect("Select members to remove", list(st.session_state.members.keys()))
+        to_remove = st.multiselect("Select members to remove", list(session.members.keys()))
         if st.button("Remove Selected Members") and to_remove:
             for member in to_remove:
-                if member in st.session_state.members:
-                    del st.session_state.members[member]
-                    if member in st.session_state.scores:
-                        del st.session_state.scores[member]
+                # Only this session's roster changes; scores already entered stay in
+                # the shared store (and its journal) for every other session
+                if member in session.members:
+                    session.members.remove(member)
+
+    # Per-session memory instrumentation for the always-on server
+    with st.sidebar.expander("Server Memory"):
+        session_stats = session_registry.stats()
+        st.write(f"**Active sessions:** {len(session_stats)} (evicted to disk: {session_registry.evicted})")
+        st.write(f"**Shared roster:** {deep_sizeof(session_registry.roster):,} bytes")
+        st.write(f"**Score store:** {cached_store_bytes(score_store.version, len(score_store.scores), score_store):,} bytes")
+        st.write(f"**This session:** {session.nbytes():,} bytes, {len(st.session_state)} widget keys")
+        st.dataframe(pd.DataFrame(session_stats, columns=["Session", "Bytes", "Idle (s)"]),
+                     use_container_width=True, hide_index=True)
+
+    with st.sidebar.expander("Startup Timing"):
+        timing = startup_metrics.summary()
+        st.write(f"**Cold first paint:** {timing['cold']:.2f}s")
+        st.write(f"**Median first paint:** {timing['median']:.3f}s over {timing['runs']} runs")
+        st.write("**Prewarmed:** " + (", ".join(f"{name} ({seconds}s)" for name, seconds in timing["prewarm"].items())
+                                      or "in progress"))
     #---------------------------------------------------------------
     # Display member availability status
     st.write("## 월레회 참가자")
@@ -104,7 +259,7 @@ with tab1:
     # Create a dataframe for better visualization
     member_df = pd.DataFrame([
         {"Name": name, "Gender": data["gender"], "Available": data["available"]}
-        for name, data in st.session_state.members.items()
+        for name, data in session.members.items()
     ])
 
     # Filter for available and unavailable members
@@ -121,47 +276,159 @@ with tab1:
         st.write(f"**Unavailable Members ({len(unavailable_members)}):**")
         st.write(", ".join(unavailable_members["Name"].tolist()))
 
+    # Rounds, holes per round, courses and scoring rules; every score sheet,
+    # entry grid, board and chart is shaped from this
+    with st.expander("Event Format"):
+        event_format = score_store.event_format
+        format_rounds = st.number_input("Rounds", min_value=1, max_value=8,
+                                        value=event_format.rounds, key="format_rounds")
+        format_holes, format_courses = [], []
+        for r in range(1, format_rounds + 1):
+            holes_col, course_col = st.columns([1, 3])
+            current = event_format.holes(r) if r <= event_format.rounds else HOLE_OPTIONS[0]
+            with holes_col:
+                format_holes.append(st.selectbox(
+                    f"Round {r} holes", HOLE_OPTIONS, key=f"format_holes_{r}",
+                    index=HOLE_OPTIONS.index(current) if current in HOLE_OPTIONS else 0))
+            with course_col:
+                format_courses.append(st.text_input(
+                    f"Round {r} course", key=f"format_course_{r}",
+                    value=event_format.courses[r - 1] if r <= event_format.rounds else ""))
+        par_col, min_col, max_col = st.columns(3)
+        with par_col:
+            format_par = st.number_input("Par per hole", min_value=1, max_value=10,
+                                         value=event_format.par, key="format_par")
+        with min_col:
+            format_min = st.number_input("Lowest score", min_value=1, max_value=10,
+                                         value=event_format.min_score, key="format_min")
+        with max_col:
+            format_max = st.number_input("Highest score", min_value=2, max_value=99,
+                                         value=event_format.max_score, key="format_max")
+        st.caption(f"{sum(format_holes)} holes per player, "
+                   f"{sum(format_holes) * len(score_store.scores):,} score cells for the current players")
+        try:
+            new_format = EventFormat(format_holes, format_courses, format_par, format_min, format_max)
+        except ValueError as e:
+            st.error(f"Invalid format: {e}.")
+            new_format = None
+        # Reshaping changes every scorer's sheet, so losses are shown before saving
+        dropped, out_of_range = [], []
+        if new_format is not None and new_format != event_format:
+            dropped, out_of_range = score_store.reshape_losses(new_format)
+        if out_of_range:
+            st.error(f"{len(out_of_range)} entered scores are outside {format_min}-{format_max}; "
+                     "widen the range or correct those scores first.")
+        confirm_drop = True
+        if dropped:
+            st.warning(f"The new format has no hole for {len(dropped)} entered scores "
+                       f"({', '.join(sorted({player for player, *_ in dropped}))}).")
+            confirm_drop = st.checkbox(f"Delete those {len(dropped)} scores for every scorer",
+                                       key="format_confirm_drop")
+        if st.button("Save Event Format",
+                     disabled=new_format is None or new_format == event_format or bool(out_of_range)
+                     or not confirm_drop):
+            try:
+                score_store.set_format(new_format, drop_scores=bool(dropped))
+            except ValueError as e:
+                # Scores entered meanwhile by another scorer
+                st.error(f"Not saved: {e}.")
+            else:
+                new_format.save("./event_format.json")
+                st.success("Event format saved.")
+
     # Group allocation options
     st.write("## Group Allocation")
-    col1, col2 = st.columns(2)
+    draw_log = DrawLog("./draw_log.jsonl")
+    col1, col2, col3 = st.columns(3)
 
     with col1:
-        # Removed balanced allocation option, keeping only Random
-        allocation_method = "Random"
-        st.write("**Allocation Method:** Random")
+        draw_event = st.text_input("Event", value=datetime.now().strftime("%Y-%m"), key="draw_event")
 
     with col2:
+        # Every draw is reproducible from its seed; the default depends only on the
+        # event and how many draws it already has, so each redraw gets a fresh seed
+        draw_number = len(draw_log.entries(draw_event))
+        draw_seed = st.number_input("Seed", min_value=0, value=event_seed(draw_event, draw_number),
+                                    step=1, key=f"draw_seed_{draw_event}_{draw_number}")
+
+    with col3:
         max_group_size = st.slider("Maximum Players per Group", 
                                 min_value=2, max_value=6, value=4)
 
-    if st.button("Allocate Groups"):
-        # Get available members
-        available_member_names = [name for name, data in st.session_state.members.items() 
-                                if data["available"]]
-        
-        # Only use random allocation since balanced option was removed
-        st.session_state.groups = allocate_groups_random(available_member_names)
+    # Get available members
+    available_member_names = [name for name, data in session.members.items() 
+                            if data["available"]]
+    member_genders = {name: session.members[name]["gender"] for name in available_member_names}
+    draw_constraints = {"max_group_size": max_group_size}
+
+    random_col, batch_col = st.columns(2)
+    with random_col:
+        if st.button("Allocate Groups"):
+            groups = allocate_groups_random(available_member_names, max_group_size, int(draw_seed))
+            draw_log.append(draw_event, int(draw_seed), available_member_names, draw_constraints,
+                            groups, balance_metrics(groups, member_genders), mode="random")
+            set_groups(groups)
+
+    with batch_col:
+        draw_candidates = st.select_slider("Candidate draws", options=[1000, 5000, 20000, 100000], value=5000)
+        if st.button("Find Best Draws"):
+            with st.spinner(f"Scoring {draw_candidates:,} draws..."):
+                st.session_state.best_draws = best_draws(available_member_names, max_group_size,
+                                                         member_genders, int(draw_seed), draw_candidates)
+
+    # Organizers pick one of the top draws (lower balance score is better)
+    if st.session_state.get("best_draws"):
+        st.write("### Top Draws")
+        for rank, (score, seed, groups) in enumerate(st.session_state.best_draws, 1):
+            draw_col, use_col = st.columns([5, 1])
+            with draw_col:
+                st.write(f"**#{rank}** seed {seed} · balance {score} · "
+                         + " / ".join(", ".join(group) for group in groups))
+            with use_col:
+                if st.button("Use", key=f"use_draw_{rank}"):
+                    draw_log.append(draw_event, seed, available_member_names,
+                                    dict(draw_constraints, candidates=draw_candidates, base_seed=int(draw_seed)),
+                                    groups, balance_metrics(groups, member_genders), mode="batch")
+                    set_groups(groups)
+                    del st.session_state.best_draws
+                    st.rerun()
+
+    with st.expander("Draw Log"):
+        event_draws = draw_log.entries(draw_event)
+        if event_draws:
+            st.dataframe(pd.DataFrame([{
+                "Time": datetime.fromtimestamp(entry["ts"]).strftime("%Y-%m-%d %H:%M:%S"),
+                "Mode": entry["mode"],
+                "Seed": entry["seed"],
+                "Players": len(entry["members"]),
+                "Group Size": entry["constraints"]["max_group_size"],
+                "Balance": entry["metrics"]["score"],
+                "Reproducible": DrawLog.verify(entry),
+                "Groups": " / ".join(", ".join(group) for group in entry["groups"]),
+            } for entry in event_draws]), use_container_width=True, hide_index=True)
+        else:
+            st.info(f"No draws recorded for {draw_event} yet.")
 
     # Display and allow manual adjustment of groups==============================
-    if st.session_state.groups:
+    if session.groups:
         st.write("## Current Groups")
         
         # Track all assigned members to prevent duplicates
         all_assigned = set()
         new_groups = []
 
-        num_cols= len(st.session_state.groups)
+        num_cols= len(session.groups)
         cols = st.columns(num_cols)
         
-        for i, (col, group) in enumerate(zip(cols, st.session_state.groups)):
+        for i, (col, group) in enumerate(zip(cols, session.groups)):
             with col:
                 st.write(f"### Group {i+1}")
                 
                 # Get member details for this group
                 group_data = []
                 for member in group:
-                    if member in st.session_state.members:
-                        member_data = st.session_state.members[member]
+                    if member in session.members:
+                        member_data = session.members[member]
                         group_data.append({
                             "Name": member,
                             "Gender": member_data["gender"]
@@ -177,8 +444,8 @@ with tab1:
                     st.write(f"**Gender Distribution:** " + ", ".join([f"{g}: {c}" for g, c in gender_counts.items()]))
                 
                 # Allow manual adjustments
-                available_for_selection = [m for m in st.session_state.members if 
-                                        st.session_state.members[m]["available"] and 
+                available_for_selection = [m for m in session.members if 
+                                        session.members[m]["available"] and 
                                         (m in group or m not in all_assigned)]
                 
                 selected_members = st.multiselect(
@@ -195,7 +462,10 @@ with tab1:
                 new_groups.append(selected_members)
         
         if st.button("Update Groups"):
-            st.session_state.groups = new_groups
+            # Manual adjustments are logged too, without a seed
+            draw_log.append(draw_event, None, available_member_names, draw_constraints,
+                            new_groups, balance_metrics(new_groups, member_genders), mode="manual")
+            set_groups(new_groups)
             st.rerun()
         
         # Export option
@@ -203,10 +473,10 @@ with tab1:
         if st.button("Copy to Clipboard"):
             # Create a text representation of the groups
             groups_text = "Golf Groups:\n\n"
-            for i, group in enumerate(st.session_state.groups, 1):
+            for i, group in enumerate(session.groups, 1):
                 groups_text += f"Group {i}:\n"
                 for member in group:
-                    member_data = st.session_state.members.get(member, {})
+                    member_data = session.members.get(member, {})
                     gender = member_data.get("gender", "N/A")
                     groups_text += f"- {member} ({gender})\n"
                 groups_text += "\n"
@@ -219,139 +489,200 @@ with tab1:
 with tab2:
     st.header("Score Collection")
     
-    if not st.session_state.groups:
+    if not session.groups:
         st.warning("Please allocate groups first in the Group Allocation tab.")
     else:
+        event_format = score_store.event_format
+
         # Select which round to enter scores for
-        round_selection = st.selectbox(
+        round_number = st.selectbox(
             "Select Round", 
-            ["Round 1", "Round 2", "Round 3", "Round 4"],
+            list(event_format.round_numbers()),
+            format_func=event_format.round_label,
             key="round_select"
         )
         
-        round_key = round_selection.lower().replace(" ", "_")
+        round_selection = event_format.round_label(round_number)
+        round_key = f"round_{round_number}"
+
+        # Long rounds are entered nine holes at a time, so the grid never
+        # holds more than 9 inputs per player
+        nines = event_format.nines(round_number)
+        if len(nines) > 1:
+            nine = st.radio("Holes", nines, format_func=lambda holes: f"{holes[0]}-{holes[-1]}",
+                            horizontal=True, key=f"nine_select_{round_key}")
+        else:
+            nine = nines[0]
+
+        # Only the selected round's (and nine's) inputs are kept in widget state
+        for key in list(st.session_state):
+            match = re.search(r"_(round_\d+)_hole_(\d+)$", key)
+            if match and (match.group(1) != round_key or int(match.group(2)) not in nine):
+                del st.session_state[key]
+
+        st.text_input("Scorer name (recorded in the change history)", key="scorer_name")
         
         # Create tabs for each group
-        group_tabs = st.tabs([f"Group {i+1}" for i in range(len(st.session_state.groups))])
+        group_tabs = st.tabs([f"Group {i+1}" for i in range(len(session.groups))])
         
-        # Function to calculate stats
-        def calculate_stats(player_scores, round_key):
-            if not any(player_scores[round_key].values()):
-                return None, None
-                
-            valid_scores = [score for score in player_scores[round_key].values() if score is not None]
-            if not valid_scores:
-                return None, None
-                
-            total = sum(valid_scores)
-            holes_played = len(valid_scores)
-            return total, round(total / holes_played, 1) if holes_played > 0 else None
-            
         # Display and collect scores for each group
-        for i, (tab, group) in enumerate(zip(group_tabs, st.session_state.groups)):
+        for i, (tab, group) in enumerate(zip(group_tabs, session.groups)):
             with tab:
                 st.subheader(f"Group {i+1} - {round_selection}")
                 
                 # Create a table-like interface for score entry
-                col_labels = st.columns([2] + [1] * 9 + [1.5, 1.5])
+                col_labels = st.columns([2] + [1] * len(nine) + [1.5, 1.5])
                 with col_labels[0]:
                     st.write("**Player**")
-                for j in range(1, 10):
+                for j, hole in enumerate(nine, 1):
                     with col_labels[j]:
-                        st.write(f"**H{j}**")
-                with col_labels[10]:
+                        st.write(f"**H{hole}**")
+                with col_labels[-2]:
                     st.write("**Total**")
-                with col_labels[11]:
+                with col_labels[-1]:
                     st.write("**Avg**")
                 
                 # Input fields for each player's scores
                 for player in group:
-                    if player in st.session_state.scores:
-                        cols = st.columns([2] + [1] * 9 + [1.5, 1.5])
+                    if player in score_store.scores:
+                        cols = st.columns([2] + [1] * len(nine) + [1.5, 1.5])
                         
                         with cols[0]:
                             st.write(player)
                         
                         # Holes input
-                        for hole in range(1, 10):
+                        for j, hole in enumerate(nine, 1):
                             hole_key = f"hole_{hole}"
-                            with cols[hole]:
-                                current_value = st.session_state.scores[player][round_key][hole_key]
-                                # Fix: Use a default value of 1 (instead of 0) when no score is entered yet
-                                display_value = 3 if current_value is None else int(current_value)
-                                new_value = st.number_input(
+                            widget_key = f"{player}_{round_key}_{hole_key}"
+                            with cols[j]:
+                                # The store is the source of truth; an empty box means no score yet
+                                current_value = score_store.scores[player][round_key][hole_key]
+                                # Seed missing keys too, otherwise an unscored hole would show
+                                # number_input's default and never report a first edit of that value
+                                if widget_key not in st.session_state or st.session_state[widget_key] != current_value:
+                                    st.session_state[widget_key] = current_value
+                                st.number_input(
                                     f"{player} - Hole {hole}",
-                                    min_value=1, 
-                                    max_value=20,
-                                    value=display_value,
+                                    min_value=event_format.min_score,
+                                    max_value=event_format.max_score,
+                                    step=1,
                                     label_visibility="collapsed",
-                                    key=f"{player}_{round_key}_{hole_key}"
+                                    key=widget_key,
+                                    on_change=on_score_change,
+                                    args=(player, round_key, hole_key, i),
                                 )
-                                # Store score if it's different from the default (1)
-                                if new_value != 1 or (current_value is not None and current_value != 1):
-                                    st.session_state.scores[player][round_key][hole_key] = new_value
-                                else:
-                                    # Reset to None if it's still the default value
-                                    st.session_state.scores[player][round_key][hole_key] = None
                         
                         # Calculate and display total and average
-                        total, avg = calculate_stats(st.session_state.scores[player], round_key)
+                        total, avg = calculate_stats(score_store.scores[player], round_key)
                         
-                        with cols[10]:
+                        with cols[-2]:
                             st.write(f"**{total}**" if total is not None else "-")
                         
-                        with cols[11]:
+                        with cols[-1]:
                             st.write(f"**{avg}**" if avg is not None else "-")
                 
                 # Save button for this group
-                if st.button(f"Save Scores for Group {i+1}", key=f"save_group_{i}"):
-                    st.success(f"Scores saved for Group {i+1}, {round_selection}")
+                undo_col, redo_col, save_col = st.columns([1, 1, 4])
+                with undo_col:
+                    st.button("Undo", key=f"undo_group_{i}", on_click=undo_group, args=(i,),
+                              disabled=not score_store.journal.can_undo(i))
+                with redo_col:
+                    st.button("Redo", key=f"redo_group_{i}", on_click=redo_group, args=(i,),
+                              disabled=not score_store.journal.can_redo(i))
+                with save_col:
+                    if st.button(f"Save Scores for Group {i+1}", key=f"save_group_{i}"):
+                        st.success(f"Scores saved for Group {i+1}, {round_selection}")
+
+                if score_api is not None:
+                    # Offline entry page served by the scorer API; it queues edits on the
+                    # phone and syncs them in one batch when the signal comes back
+                    api_host = st.context.headers.get("Host", "localhost").split(":")[0]
+                    offline_query = urlencode({"players": ",".join(group), "round": round_number,
+                                               "holes": event_format.holes(round_number),
+                                               "min": event_format.min_score, "max": event_format.max_score,
+                                               "author": st.session_state.get("scorer_name", "")})
+                    st.link_button(f"Offline entry for Group {i+1}",
+                                   f"http://{api_host}:{score_api.server_port}/offline?{offline_query}")
+
+        with st.expander("Scorer Device API"):
+            if score_api is None:
+                st.warning("The scorer API could not start (is the port already in use?). "
+                           "Set PARKGOLF_API_PORT to choose another port.")
+            else:
+                st.write(f"Scorer devices can post batched hole scores to port **{score_api.server_port}**:")
+                st.code(
+                    "POST /scores  {\"request_id\": \"<uuid>\", \"base_version\": "
+                    f"{score_store.version}, \"group\": 0, \"author\": \"kim\",\n"
+                    "               \"updates\": [{\"player\": \"<name>\", \"round\": 1, \"hole\": 3, \"score\": 4}]}\n"
+                    "GET  /changes?since=<version>\n"
+                    "GET  /version",
+                    language="text",
+                )
+
+        # Concurrent offline edits settled last-writer-wins, kept for review
+        if score_store.conflicts:
+            with st.expander(f"Sync Conflicts ({len(score_store.conflicts)})"):
+                conflicts_df = pd.DataFrame(list(score_store.conflicts))
+                conflicts_df["ts"] = pd.to_datetime(conflicts_df["ts"], unit="s")
+                st.dataframe(conflicts_df.rename(columns={"ts": "Device Time"}),
+                             use_container_width=True, hide_index=True)
+                if st.button("Mark Conflicts Reviewed"):
+                    score_store.conflicts.clear()
+                    st.rerun()
+
+        # Audit view of the change journal
+        with st.expander("Change History"):
+            journal = score_store.journal
+            show_all = st.checkbox("Show full history (reads from disk)", key="history_all")
+            history = journal.history(None if show_all else 50)
+            if history:
+                history_df = pd.DataFrame([{
+                    "#": change.seq,
+                    "Time": datetime.fromtimestamp(change.ts).strftime("%Y-%m-%d %H:%M:%S"),
+                    "Scorer": change.author or "-",
+                    "Group": f"Group {change.group + 1}" if isinstance(change.group, int) else "-",
+                    "Player": change.player,
+                    "Round": change.round_key.replace("round_", "R"),
+                    "Hole": change.hole_key.replace("hole_", "H"),
+                    "Before": change.before,
+                    "After": change.after,
+                    "Action": change.action,
+                } for change in history])
+                st.dataframe(history_df, use_container_width=True, hide_index=True)
+
+                snapshot_seq = st.number_input("Rebuild score sheet as of change #",
+                                               min_value=0, max_value=journal.seq,
+                                               value=journal.seq, key="snapshot_seq")
+                snapshot_board = build_leaderboard(journal.snapshot_at(snapshot_seq), score_store.event_format.par)
+                if snapshot_board:
+                    st.dataframe(pd.DataFrame(snapshot_board), use_container_width=True, hide_index=True)
+                else:
+                    st.info("No scores had been entered at that point.")
+            else:
+                st.info("No score changes recorded yet.")
     with tab3:
         # Summary statistics section
         st.header("Score Summary")
+        st.caption("Clubhouse screen: open this app with `?view=leaderboard&refresh=30` "
+                   "for an auto-refreshing read-only leader board.")
         
+        summary_event = st.text_input("Event", value=datetime.now().strftime("%Y-%m"), key="summary_event")
         if st.button("Generate Summary"):
             # Create summary dataframe
             summary_data = []
             
             # Get all players with scores
-            all_players = [player for group in st.session_state.groups for player in group]
+            all_players = [player for group in session.groups for player in group]
             
             for player in all_players:
-                if player in st.session_state.scores:
-                    player_data = {"Player": player}
-                    
-                    # Add round data
-                    for r in range(1, 5):
-                        round_key = f"round_{r}"
-                        total, avg = calculate_stats(st.session_state.scores[player], round_key)
-                        player_data[f"Round {r} Total"] = total if total is not None else "-"
-                        # player_data[f"Round {r} Avg"] = avg if avg is not None else "-"
-                    
-                    # Calculate overall statistics
-                    all_scores = []
-                    for r in range(1, 5):
-                        round_key = f"round_{r}"
-                        scores = [score for score in st.session_state.scores[player][round_key].values() 
-                                if score is not None]
-                        all_scores.extend(scores)
-                    
-                    if all_scores:
-                        player_data["Overall Total"] = sum(all_scores)
-                        # player_data["Overall Avg"] = round(sum(all_scores) / len(all_scores), 1)
-                        player_data["Best Score"] = min(all_scores) if all_scores else "-"
-                        player_data["Worst Score"] = max(all_scores) if all_scores else "-"
-                    else:
-                        player_data["Overall Total"] = "-"
-                        # player_data["Overall Avg"] = "-"
-                        player_data["Best Score"] = "-"
-                        player_data["Worst Score"] = "-"
-                    
-                    summary_data.append(player_data)
+                if player in score_store.scores:
+                    summary_data.append(summarize_player(player, score_store.scores[player]))
             
             # Display summary
             if summary_data:
                 summary_df = pd.DataFrame(summary_data)
+                # Track-record files carry the event so they can be imported into the history later
+                summary_df.insert(0, "Event", summary_event)
                 st.dataframe(summary_df, use_container_width=True)
                 
                 # Add download button for CSV
@@ -365,40 +696,92 @@ with tab2:
                     )
             else:
                 st.warning("No scores have been entered yet.")
+
+        # Team competition over the same per-hole scores
+        st.header("Team Leader Board")
+        team_col1, team_col2, team_col3 = st.columns(3)
+        with team_col1:
+            team_source = st.radio("Teams", ["Groups", "Custom Pairs"], horizontal=True, key="team_source")
+        with team_col2:
+            team_format = st.selectbox("Team Format", TEAM_FORMATS, key="team_format")
+        with team_col3:
+            best_n = st.number_input("N (Best N of M)", min_value=1, max_value=6, value=2,
+                                     key="team_best_n", disabled=team_format != "Best N of M")
+
+        if team_source == "Groups":
+            teams = tuple(tuple(group) for group in session.groups if group)
+            team_names = [f"Group {i+1}" for i, group in enumerate(session.groups) if group]
+        else:
+            pairs_text = st.text_area("One team per line, members separated by commas", key="custom_pairs")
+            teams = tuple(
+                tuple(name.strip() for name in line.split(",") if name.strip() in session.members)
+                for line in pairs_text.splitlines()
+            )
+            teams = tuple(team for team in teams if team)
+            team_names = None
+
+        if teams:
+            team_board = get_team_board(teams, team_format, best_n if team_format == "Best N of M" else 2,
+                                        score_store.event_format)
+            individual_col, team_col = st.columns(2)
+            with individual_col:
+                st.subheader("Individual")
+                st.dataframe(cached_leaderboard(score_store.version, score_store)[["Rank", "Player", "To Par", "Holes"]],
+                             use_container_width=True, hide_index=True)
+            with team_col:
+                st.subheader(team_format)
+                st.dataframe(team_board.standings(team_names)[["Rank", "Team", "Members", "To Par", "Holes"]],
+                             use_container_width=True, hide_index=True)
+        else:
+            st.info("Allocate groups or enter custom pairs to see team standings.")
+
+        # Per-division standings and group/division averages all come from
+        # one grouped aggregation over the score store
+        score_df = cached_scores_frame(score_store.version, score_store)
+        labels_df = division_labels(session.members, session.groups)
+        division_standings, division_summary = division_aggregates(score_df, labels_df, score_store.event_format.par)
+
+        st.header("Division Leader Board")
+        division_types = list(division_summary["Division Type"].unique())
+        if division_types:
+            division_type = st.selectbox("Division", division_types, key="division_type")
+            st.dataframe(division_summary[division_summary["Division Type"] == division_type]
+                         .drop(columns="Division Type"),
+                         use_container_width=True, hide_index=True)
+
+            type_standings = division_standings[division_standings["Division Type"] == division_type]
+            division_names = list(type_standings["Division"].unique())
+            for division_tab, division in zip(st.tabs(division_names), division_names):
+                with division_tab:
+                    st.dataframe(type_standings[type_standings["Division"] == division]
+                                 [["Rank", "Player", "To Par", "Holes"]],
+                                 use_container_width=True, hide_index=True)
+        else:
+            st.info("Enter some scores to see division standings.")
         
         # Visualize scores
         st.header("Score Visualization")
         
         # Only show if there's data to visualize
-        any_scores = False
-        for player in st.session_state.scores:
-            for round_key in st.session_state.scores[player]:
-                if any(score is not None for score in st.session_state.scores[player][round_key].values()):
-                    any_scores = True
-                    break
-            if any_scores:
-                break
-        
-        if any_scores:
+        if not score_df.empty:
             viz_type = st.selectbox(
                 "Select Visualization", 
-                ["Player Performance by Round", "Group Performance Comparison"]
+                ["Player Performance by Round", "Group Performance Comparison", "Division Comparison"]
             )
             
             if viz_type == "Player Performance by Round":
                 # Allow selection of a player
-                all_players = [player for group in st.session_state.groups for player in group]
+                all_players = [player for group in session.groups for player in group]
                 selected_player = st.selectbox("Select Player", all_players)
                 
-                if selected_player in st.session_state.scores:
+                if selected_player in score_store.scores:
                     # Create data for chart
                     chart_data = []
                     
-                    for r in range(1, 5):
+                    for r in score_store.event_format.round_numbers():
                         round_key = f"round_{r}"
-                        for h in range(1, 10):
-                            hole_key = f"hole_{h}"
-                            score = st.session_state.scores[selected_player][round_key][hole_key]
+                        for h, hole_key in enumerate(score_store.event_format.hole_keys(r), 1):
+                            score = score_store.scores[selected_player][round_key][hole_key]
                             if score is not None:
                                 chart_data.append({
                                     "Round": f"Round {r}",
@@ -413,30 +796,18 @@ with tab2:
                         st.info(f"No scores recorded for {selected_player} yet.")
             
             elif viz_type == "Group Performance Comparison":
-                # Calculate and show group averages
-                group_data = []
-                
-                for i, group in enumerate(st.session_state.groups):
-                    group_scores = []
-                    for player in group:
-                        if player in st.session_state.scores:
-                            for r in range(1, 5):
-                                round_key = f"round_{r}"
-                                scores = [score for score in st.session_state.scores[player][round_key].values() 
-                                        if score is not None]
-                                group_scores.extend(scores)
-                    
-                    if group_scores:
-                        group_data.append({
-                            "Group": f"Group {i+1}",
-                            "Avg Score": sum(group_scores) / len(group_scores)
-                        })
-                
-                if group_data:
-                    group_df = pd.DataFrame(group_data)
-                    st.bar_chart(data=group_df, x="Group", y="Avg Score")
+                # Group averages are the "Group" rows of the division summary
+                group_df = division_summary[division_summary["Division Type"] == "Group"]
+                if not group_df.empty:
+                    st.bar_chart(data=group_df.rename(columns={"Division": "Group"}),
+                                 x="Group", y="Avg Score")
                 else:
                     st.info("Not enough score data to compare groups.")
+
+            elif viz_type == "Division Comparison":
+                compare_type = st.selectbox("Division Type", division_types, key="compare_division_type")
+                compare_df = division_summary[division_summary["Division Type"] == compare_type]
+                st.bar_chart(data=compare_df, x="Division", y="Avg Score")
         else:
             st.info("Enter some scores to enable visualizations.")
     with tab4:
@@ -451,9 +822,35 @@ with tab2:
             st.write("Existing Data:")
             st.dataframe(existing_df)
 
+            # Older records can seed the history analytics; rows that don't say
+            # which event they belong to are filed under the event given here
+            if "Player" in existing_df.columns:
+                import_event = st.text_input("Event for rows without one",
+                                             value=datetime.now().strftime("%Y-%m"), key="import_event")
+                if st.button("Import Records into History"):
+                    records_df = existing_df.copy()
+                    if "Event" not in records_df.columns:
+                        records_df["Event"] = import_event
+                    records_df["Event"] = records_df["Event"].fillna(import_event)
+                    round_columns = [c for c in records_df.columns if re.fullmatch(r"Round \d+ Total", str(c))]
+                    imported = 0
+                    for event_id, event_df in records_df.groupby("Event", sort=False):
+                        round_totals = {
+                            row["Player"]: {int(c.split()[1]): pd.to_numeric(row[c], errors="coerce")
+                                            for c in round_columns}
+                            for _, row in event_df.iterrows()
+                        }
+                        imported += get_history_engine().append_event(
+                            str(event_id), round_totals=round_totals,
+                            holes_per_round=score_store.event_format.holes_per_round,
+                            courses=score_store.event_format.courses)
+                    st.success(f"Imported {imported} new event(s) into the history.")
+
             # Append summary_df data to existing dataframe
             if "summary_df" in locals():
                 updated_df = pd.concat([existing_df, summary_df], ignore_index=True)
+            else:
+                updated_df = existing_df
             st.write("Updated Data:")
             st.dataframe(updated_df)
 
@@ -472,3 +869,58 @@ with tab2:
         else:
             st.warning("No summary data available to append.")
 
+        # History analytics over every archived event
+        st.header("History Analytics")
+        history_engine = get_history_engine()
+
+        archive_col1, archive_col2 = st.columns([3, 1])
+        with archive_col1:
+            event_id = st.text_input("Event", value=datetime.now().strftime("%Y-%m"), key="archive_event")
+        with archive_col2:
+            st.write("")
+            if st.button("Archive Current Event"):
+                participants = {player for group in session.groups for player in group}
+                event_scores = {player: player_scores for player, player_scores in score_store.snapshot().items()
+                                if player in participants}
+                if history_engine.append_event(event_id, scores=event_scores,
+                                               holes_per_round=score_store.event_format.holes_per_round,
+                                               courses=score_store.event_format.courses):
+                    st.success(f"Archived {event_id}.")
+                else:
+                    st.warning(f"{event_id} is already archived or has no scores.")
+
+        # The shared sheet (and its journal) outlives restarts, so the next
+        # event only starts when someone says so
+        with st.expander("Start New Event"):
+            if event_id not in history_engine.events:
+                st.warning(f"{event_id} has not been archived yet; archive it first to keep it in the history.")
+            st.write("Clears the score sheet for every scorer, the clubhouse board and offline devices. "
+                     "The current change history is kept under score_journal/archive.")
+            confirm_new_event = st.checkbox("Clear every scorer's sheet", key="confirm_new_event")
+            if st.button("Start New Event", disabled=not confirm_new_event):
+                score_store.start_event()
+                set_groups(session.groups)
+                st.success("New event started.")
+
+        if history_engine.version:
+            st.caption(f"{history_engine.version} events archived")
+            st.subheader("Member Trends")
+            trends_df = cached_member_trends(history_engine.version, history_engine)
+            st.dataframe(trends_df.sort_values("Slope"), use_container_width=True, hide_index=True)
+
+            history_player = st.selectbox("Player", sorted(trends_df["Player"]), key="history_player")
+            series_col, h2h_col = st.columns(2)
+            with series_col:
+                st.line_chart(history_engine.player_series(history_player), x="Event", y="Strokes per Hole")
+            with h2h_col:
+                st.dataframe(history_engine.head_to_head_for(history_player),
+                             use_container_width=True, hide_index=True)
+
+            difficulty_df = cached_hole_difficulty(history_engine.version, history_engine)
+            if not difficulty_df.empty:
+                st.subheader("Hole Difficulty")
+                difficulty_df["Hole"] = difficulty_df["Course"] + " H" + difficulty_df["Hole"].astype(str)
+                st.bar_chart(difficulty_df, x="Hole", y="vs Field")
+        else:
+            st.info("Archive an event (or import track records with an Event column) to build the history.")
+
@@ -0,0 +1,83 @@
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+AGE_COLUMNS = ["나이", "연령", "Age"]
+HANDICAP_COLUMNS = ["핸디", "핸디캡", "Handicap"]
+# Roster columns used as-is as division labels; anything else (notes, phone
+# numbers, ...) is ignored
+CUSTOM_DIVISION_COLUMNS = ["부문", "등급", "소속", "클럽", "Division", "Flight", "Club"]
+
+AGE_BANDS = [(0, 60, "60세 미만"), (60, 70, "60대"), (70, 80, "70대"), (80, 200, "80세 이상")]
+HANDICAP_BRACKETS = [(-100, 10, "HC 0-9"), (10, 20, "HC 10-19"), (20, 100, "HC 20+")]
+
+
+def _bracket(value, brackets):
+    for low, high, label in brackets:
+        if low <= value < high:
+            return label
+    return None
+
+
+def member_divisions(row):
+    """Division labels for one roster row (a pandas Series from the 회원명부 sheet).
+
+    Gender is always present; age band and handicap bracket are derived
+    when the workbook has those columns (values that aren't numbers, e.g.
+    "65세", are skipped), and the CUSTOM_DIVISION_COLUMNS it has are used
+    as-is as division labels.
+    """
+    divisions = {"Gender": row["성별"]}
+    for column, value in row.items():
+        if pd.isna(value):
+            continue
+        if column in AGE_COLUMNS or column in HANDICAP_COLUMNS:
+            number = pd.to_numeric(value, errors="coerce")
+            label = None if pd.isna(number) else _bracket(
+                number, AGE_BANDS if column in AGE_COLUMNS else HANDICAP_BRACKETS)
+            if label:
+                divisions["Age" if column in AGE_COLUMNS else "Handicap"] = label
+        elif column in CUSTOM_DIVISION_COLUMNS:
+            divisions[str(column)] = str(value)
+    return divisions
+
+
+def division_labels(members, groups=()):
+    """Long-format (Player, Division Type, Division) frame for every member.
+
+    Allocated groups are included as the "Group" division type so group
+    averages come out of the same aggregation as the other divisions.
+    """
+    records = [(name, division_type, label)
+               for name, data in members.items()
+               for division_type, label in data.get("divisions", {"Gender": data["gender"]}).items()]
+    records += [(player, "Group", f"Group {i+1}")
+                for i, group in enumerate(groups) for player in group]
+    return pd.DataFrame.from_records(records, columns=["Player", "Division Type", "Division"])
+
+
+def division_aggregates(score_df, labels_df, par=3):
+    """Per-division standings and summary for every division type at once.
+
+    `score_df` is the long (Player, Round, Hole, Score) frame of the score
+    store. Player totals are computed once, joined to the division labels
+    and ranked/aggregated with a single groupby over (Division Type,
+    Division), so adding a division type only adds rows, not passes.
+    Players are ranked by score to `par` for the holes they have played,
+    like the main leader board.
+    """
+    totals = score_df.groupby("Player")["Score"].agg(Total="sum", Holes="count")
+    totals["To Par"] = totals["Total"] - par * totals["Holes"]
+    standings = labels_df.merge(totals, left_on="Player", right_index=True)
+    keys = ["Division Type", "Division"]
+    grouped = standings.groupby(keys)
+
+    standings["Rank"] = grouped["To Par"].rank(method="min").astype(int)
+    standings = standings.sort_values(keys + ["Rank", "Player"]).reset_index(drop=True)
+
+    summary = grouped.agg(Players=("Player", "size"), Strokes=("Total", "sum"),
+                          Holes=("Holes", "sum"), Best=("To Par", "min"))
+    summary["Avg Total"] = (summary["Strokes"] / summary["Players"]).round(1)
+    summary["Avg Score"] = (summary["Strokes"] / summary["Holes"]).round(2)
+    summary = summary.reset_index()[keys + ["Players", "Avg Total", "Avg Score", "Best"]]
+    return standings, summary
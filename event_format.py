@@ -0,0 +1,88 @@
+import json
+import os
+
+# Park golf rounds are played on 9-hole courses, so rounds come in multiples of 9
+HOLE_OPTIONS = [9, 18, 27, 36]
+
+
+class EventFormat:
+    """Shape and scoring rules of an event.
+
+    Score storage, the entry grid, stats, leader boards and team arrays
+    are all sized from this instead of assuming 4 rounds of 9 holes.
+    """
+
+    def __init__(self, holes_per_round=(9, 9, 9, 9), courses=None, par=3, min_score=1, max_score=20):
+        self.holes_per_round = [int(holes) for holes in holes_per_round]
+        if not self.holes_per_round or min(self.holes_per_round) < 1:
+            raise ValueError("an event needs at least one round with at least one hole")
+        courses = list(courses or [])
+        self.courses = (courses + [""] * self.rounds)[:self.rounds]
+        self.par = int(par)
+        self.min_score = int(min_score)
+        self.max_score = int(max_score)
+        if self.min_score > self.max_score:
+            raise ValueError("the lowest score must not be above the highest score")
+
+    @property
+    def rounds(self):
+        return len(self.holes_per_round)
+
+    @property
+    def max_holes(self):
+        return max(self.holes_per_round)
+
+    @property
+    def total_holes(self):
+        return sum(self.holes_per_round)
+
+    def round_numbers(self):
+        return range(1, self.rounds + 1)
+
+    def holes(self, round_number):
+        return self.holes_per_round[round_number - 1]
+
+    def hole_keys(self, round_number):
+        return [f"hole_{h}" for h in range(1, self.holes(round_number) + 1)]
+
+    def round_label(self, round_number):
+        course = self.courses[round_number - 1]
+        return f"Round {round_number} ({course})" if course else f"Round {round_number}"
+
+    def nines(self, round_number):
+        """Hole ranges of at most 9 holes, used to page the entry grid"""
+        return [range(start, min(start + 9, self.holes(round_number) + 1))
+                for start in range(1, self.holes(round_number) + 1, 9)]
+
+    def empty_scores(self):
+        return {f"round_{r}": {hole_key: None for hole_key in self.hole_keys(r)}
+                for r in self.round_numbers()}
+
+    def key(self):
+        """Hashable identity, for caches keyed on the format"""
+        return (tuple(self.holes_per_round), tuple(self.courses), self.par, self.min_score, self.max_score)
+
+    def __eq__(self, other):
+        return isinstance(other, EventFormat) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def to_dict(self):
+        return {"holes_per_round": self.holes_per_round, "courses": self.courses, "par": self.par,
+                "min_score": self.min_score, "max_score": self.max_score}
+
+    @classmethod
+    def load(cls, path):
+        """The format saved at `path`, or the default 4 x 9 holes"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+DEFAULT_FORMAT = EventFormat()
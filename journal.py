@@ -0,0 +1,219 @@
+import bisect
+import json
+import os
+import time
+import uuid
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# One recorded cell change; `action` is "edit", "undo", "redo" or "sync".
+# `ts` is when the score was entered (on the device, for synced edits) and
+# `clock` the cell's version vector afterwards, so offline merging still
+# works after a restart
+Change = namedtuple("Change", ["seq", "ts", "author", "group", "player",
+                               "round_key", "hole_key", "before", "after", "action", "clock"])
+
+
+class ChangeJournal:
+    """Append-only record of every score cell change.
+
+    The most recent changes are kept in a fixed-size ring buffer for the
+    audit view; the full history is appended to `journal.jsonl` on disk.
+    Every `checkpoint_every` changes a full snapshot of the score sheet is
+    written to `checkpoints.jsonl`, so any past state can be rebuilt from
+    the nearest checkpoint plus the deltas after it.
+
+    The journal covers one event (`event_id`); `rotate` moves it to
+    `archive/<event_id>/` and starts the next one.
+    """
+
+    def __init__(self, directory, capacity=500, checkpoint_every=200, undo_depth=100):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.journal_path = os.path.join(directory, "journal.jsonl")
+        self.checkpoint_path = os.path.join(directory, "checkpoints.jsonl")
+        self.checkpoint_every = checkpoint_every
+        self.undo_depth = undo_depth
+        self.recent = deque(maxlen=capacity)
+        self.seq = 0
+        self.event_id = uuid.uuid4().hex[:12]
+        # (seq, checkpoint file offset, journal file offset) per checkpoint
+        self._checkpoints = []
+        self._undo = {}
+        self._redo = {}
+        self._batch_file = None
+        self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    change = Change(*json.loads(line))
+                    self.recent.append(change)
+                    self.seq = change.seq
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb") as f:
+                offset = f.tell()
+                for line in iter(f.readline, b""):
+                    entry = json.loads(line)
+                    self._checkpoints.append((entry["seq"], offset, entry["journal_offset"]))
+                    self.event_id = entry["event"]
+                    offset = f.tell()
+            # A reshape advances the sequence with a checkpoint and no change
+            if self._checkpoints:
+                self.seq = max(self.seq, self._checkpoints[-1][0])
+
+    @contextmanager
+    def batch(self):
+        """Keep the journal file open while a large batch of changes is recorded"""
+        if self._batch_file is not None:
+            yield
+            return
+        with open(self.journal_path, "ab") as f:
+            self._batch_file = f
+            try:
+                yield
+            finally:
+                self._batch_file = None
+
+    def _journal_size(self):
+        if self._batch_file is not None:
+            self._batch_file.flush()
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    def checkpoint(self, scores, force=False, seq=None):
+        """Write a full snapshot of `scores` as of the current sequence number.
+
+        `force` writes one even if a checkpoint already exists for this
+        sequence number; the latest wins. `seq` first moves the sequence
+        number forward, for store changes that are not cell edits (e.g.
+        reshaping the sheet), so it keeps matching the store's version.
+        """
+        if seq is not None:
+            self.seq = max(self.seq, seq)
+        if not force and self._checkpoints and self._checkpoints[-1][0] == self.seq:
+            return
+        journal_offset = self._journal_size()
+        line = json.dumps({"seq": self.seq, "journal_offset": journal_offset, "event": self.event_id,
+                           "scores": scores}, ensure_ascii=False)
+        with open(self.checkpoint_path, "ab") as f:
+            offset = f.tell()
+            f.write(line.encode("utf-8") + b"\n")
+        self._checkpoints.append((self.seq, offset, journal_offset))
+
+    def rotate(self, scores, seq):
+        """Archive this event's files and start a new event from `scores` at sequence `seq`.
+
+        Sequence numbers keep counting up, so store versions stay monotonic
+        across events. Returns the new event id.
+        """
+        archive = os.path.join(self.directory, "archive", self.event_id)
+        os.makedirs(archive, exist_ok=True)
+        for path in (self.journal_path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.replace(path, os.path.join(archive, os.path.basename(path)))
+        self.recent.clear()
+        self._checkpoints = []
+        self._undo = {}
+        self._redo = {}
+        self.event_id = uuid.uuid4().hex[:12]
+        self.checkpoint(scores, seq=seq)
+        return self.event_id
+
+    def record(self, scores, author, group, player, round_key, hole_key, before, after, action="edit",
+               clock=None, ts=None):
+        """Append a change; `scores` is the sheet *after* the change (for checkpoints)"""
+        self.seq += 1
+        change = Change(self.seq, time.time() if ts is None else ts, author, group, player,
+                        round_key, hole_key, before, after, action, clock or {})
+        self.recent.append(change)
+        line = json.dumps(list(change), ensure_ascii=False).encode("utf-8") + b"\n"
+        if self._batch_file is not None:
+            self._batch_file.write(line)
+        else:
+            with open(self.journal_path, "ab") as f:
+                f.write(line)
+
+        if group is not None:
+            undo_stack = self._undo.setdefault(group, deque(maxlen=self.undo_depth))
+            redo_stack = self._redo.setdefault(group, deque(maxlen=self.undo_depth))
+            if action == "undo":
+                redo_stack.append(change)
+            else:
+                undo_stack.append(change)
+                if action == "edit":
+                    redo_stack.clear()
+
+        last_checkpoint = self._checkpoints[-1][0] if self._checkpoints else 0
+        if self.seq - last_checkpoint >= self.checkpoint_every:
+            self.checkpoint(scores)
+        return change
+
+    def pop_undo(self, group):
+        stack = self._undo.get(group)
+        return stack.pop() if stack else None
+
+    def pop_redo(self, group):
+        stack = self._redo.get(group)
+        return stack.pop() if stack else None
+
+    def prune_stacks(self, keep):
+        """Drop undo/redo entries whose cell fails `keep(player, round_key, hole_key)`"""
+        for stacks in (self._undo, self._redo):
+            for group, stack in stacks.items():
+                stacks[group] = deque((change for change in stack
+                                       if keep(change.player, change.round_key, change.hole_key)),
+                                      maxlen=self.undo_depth)
+
+    def can_undo(self, group):
+        return bool(self._undo.get(group))
+
+    def can_redo(self, group):
+        return bool(self._redo.get(group))
+
+    def latest_changes(self):
+        """The last recorded Change of every cell, oldest first"""
+        latest = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    change = Change(*json.loads(line))
+                    cell = (change.player, change.round_key, change.hole_key)
+                    latest.pop(cell, None)
+                    latest[cell] = change
+        return list(latest.values())
+
+    def history(self, limit=None):
+        """Most recent changes first; reads the disk journal once the ring buffer runs out"""
+        if limit is not None and limit <= len(self.recent):
+            return list(reversed(self.recent))[:limit]
+        changes = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                changes = [Change(*json.loads(line)) for line in f]
+        changes.reverse()
+        return changes if limit is None else changes[:limit]
+
+    def snapshot_at(self, seq):
+        """Rebuild the score sheet as it was right after change number `seq`"""
+        index = bisect.bisect_right([c[0] for c in self._checkpoints], seq) - 1
+        if index >= 0:
+            base_seq, checkpoint_offset, journal_offset = self._checkpoints[index]
+            with open(self.checkpoint_path, "rb") as f:
+                f.seek(checkpoint_offset)
+                scores = json.loads(f.readline())["scores"]
+        else:
+            base_seq, journal_offset, scores = 0, 0, {}
+
+        if base_seq < seq and os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                f.seek(journal_offset)
+                for line in f:
+                    change = Change(*json.loads(line))
+                    if change.seq <= base_seq:
+                        continue
+                    if change.seq > seq:
+                        break
+                    round_scores = scores.setdefault(change.player, {}).setdefault(change.round_key, {})
+                    round_scores[change.hole_key] = change.after
+        return scores
@@ -0,0 +1,82 @@
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+
+# Function to calculate stats
+def calculate_stats(player_scores, round_key):
+    if not any(player_scores.get(round_key, {}).values()):
+        return None, None
+
+    valid_scores = [score for score in player_scores[round_key].values() if score is not None]
+    if not valid_scores:
+        return None, None
+
+    total = sum(valid_scores)
+    holes_played = len(valid_scores)
+    return total, round(total / holes_played, 1) if holes_played > 0 else None
+
+
+def summarize_player(player, player_scores):
+    """Build one summary row (round totals, overall total, best/worst hole)"""
+    player_data = {"Player": player}
+    # Rounds come from the sheet itself, which is shaped by the event format
+    round_keys = sorted(player_scores, key=lambda round_key: int(round_key.split("_")[1]))
+
+    # Add round data
+    for round_key in round_keys:
+        total, avg = calculate_stats(player_scores, round_key)
+        player_data[f"Round {round_key.split('_')[1]} Total"] = total if total is not None else "-"
+
+    # Calculate overall statistics
+    all_scores = []
+    for round_key in round_keys:
+        scores = [score for score in player_scores[round_key].values()
+                  if score is not None]
+        all_scores.extend(scores)
+    player_data["Holes"] = len(all_scores)
+
+    if all_scores:
+        player_data["Overall Total"] = sum(all_scores)
+        player_data["Best Score"] = min(all_scores)
+        player_data["Worst Score"] = max(all_scores)
+    else:
+        player_data["Overall Total"] = "-"
+        player_data["Best Score"] = "-"
+        player_data["Worst Score"] = "-"
+
+    return player_data
+
+
+def build_leaderboard(scores, par=3):
+    """Rank every player with at least one recorded hole by score to par.
+
+    To par compares each total with `par` for the holes actually played,
+    so a player three holes in doesn't lead one twenty holes in just by
+    having fewer strokes. Ties share the same rank (1, 2, 2, 4, ...).
+    """
+    rows = [summarize_player(player, player_scores)
+            for player, player_scores in scores.items()]
+    rows = [row for row in rows if row["Overall Total"] != "-"]
+    for row in rows:
+        row["To Par"] = row["Overall Total"] - par * row["Holes"]
+    rows.sort(key=lambda row: (row["To Par"], -row["Holes"], row["Player"]))
+
+    previous_to_par = None
+    rank = 0
+    for position, row in enumerate(rows, 1):
+        if row["To Par"] != previous_to_par:
+            rank = position
+            previous_to_par = row["To Par"]
+        row["Rank"] = rank
+    return rows
+
+
+def scores_frame(scores):
+    """Long-format (Player, Round, Hole, Score) frame of every recorded hole"""
+    records = [(player, int(round_key.split("_")[1]), int(hole_key.split("_")[1]), score)
+               for player, rounds in scores.items()
+               for round_key, holes in rounds.items()
+               for hole_key, score in holes.items()
+               if score is not None]
+    return pd.DataFrame.from_records(records, columns=["Player", "Round", "Hole", "Score"])
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Requests larger than this are rejected rather than read into memory
+MAX_BODY_BYTES = 1 << 20
+OFFLINE_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "offline_entry.html")
+
+
+def _cell(update, event_format):
+    """(player, round_key, hole_key, value) from one JSON update.
+
+    Rounds and holes may be given as numbers (1, 3) or as store keys
+    ("round_1", "hole_3"); a null score clears the hole.
+    """
+    round_value, hole_value = str(update["round"]), str(update["hole"])
+    round_key = round_value if round_value.startswith("round_") else f"round_{int(round_value)}"
+    hole_key = hole_value if hole_value.startswith("hole_") else f"hole_{int(hole_value)}"
+    score = update.get("score")
+    if score is not None:
+        score = int(score)
+        if not event_format.min_score <= score <= event_format.max_score:
+            raise ValueError(f"score out of range: {score}")
+    return update["player"], round_key, hole_key, score
+
+
+def _group(request):
+    """Entry group index from a request body: an int or null"""
+    group = request.get("group")
+    if group is not None and (isinstance(group, bool) or not isinstance(group, int)):
+        raise ValueError(f"group must be an integer or null: {group!r}")
+    return group
+
+
+class ScoreAPIHandler(BaseHTTPRequestHandler):
+    """JSON endpoints for scorer devices.
+
+    GET  /version                 -> {"version": n, "event": id}
+    GET  /changes?since=<version> -> {"version": n, "event": id, "reset": bool, "changes": [[player, round, hole, score, version, clock], ...]}
+    POST /scores                  <- {"request_id", "base_version", "author", "group", "updates": [{"player", "round", "hole", "score"}]}
+                                  -> {"version", "applied", "conflicts"} (409 when there are conflicts)
+    POST /sync                    <- {"request_id", "device", "author", "entries": [{"player", "round", "hole", "score", "clock", "ts"}]}
+                                  -> {"version", "applied", "stale", "conflicts", "cells"}
+    GET  /offline                 -> offline score entry page (queues edits and syncs via /sync)
+
+    No CORS headers are sent: the only browser client is /offline on the
+    same origin, and other pages a scorer opens must not be able to write.
+    """
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        store = self.server.store
+        url = urlparse(self.path)
+        if url.path == "/offline":
+            with open(OFFLINE_PAGE, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == "/version":
+            self._send(200, {"version": store.version, "event": store.event_id})
+        elif url.path == "/changes":
+            try:
+                since = int(parse_qs(url.query).get("since", ["0"])[0])
+            except ValueError:
+                self._send(400, {"error": "since must be an integer"})
+                return
+            # A client ahead of the server means the server restarted; send everything
+            reset = since > store.version
+            changes = store.changes_since(0 if reset else since)
+            self._send(200, {"version": store.version, "event": store.event_id, "reset": reset,
+                             "changes": [list(change) for change in changes]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path not in ("/scores", "/sync"):
+            self._send(404, {"error": "not found"})
+            return
+        # Browsers only send this content type cross-origin after a preflight,
+        # which is never granted, so a foreign page can't fire a "simple" POST
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send(413, {"error": "request too large"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if path == "/sync":
+                entries = [_cell(entry, self.server.store.event_format) + ({str(d): int(n) for d, n in entry["clock"].items()},
+                                           float(entry["ts"]))
+                           for entry in request["entries"]]
+                result = self.server.store.merge_batch(
+                    str(request["device"]),
+                    entries,
+                    request_id=request.get("request_id"),
+                    author=request.get("author"),
+                )
+                self._send(200, result)
+                return
+            updates = [_cell(update, self.server.store.event_format) for update in request["updates"]]
+            result = self.server.store.apply_batch(
+                updates,
+                base_version=request.get("base_version"),
+                request_id=request.get("request_id"),
+                author=request.get("author"),
+                group=_group(request),
+            )
+        except KeyError as e:
+            self._send(400, {"error": f"unknown or missing field: {e}"})
+            return
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(409 if result["conflicts"] else 200, result)
+
+    def log_message(self, format, *args):
+        # Scorer devices poll often; keep the server log quiet
+        pass
+
+
+def start_api_server(store, host="0.0.0.0", port=8502):
+    """Serve `store` over HTTP from a daemon thread; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), ScoreAPIHandler)
+    server.daemon_threads = True
+    server.store = store
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
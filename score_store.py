@@ -0,0 +1,352 @@
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+
+from event_format import DEFAULT_FORMAT
+
+
+# Initialize score structure for a player
+def init_player_scores(event_format=DEFAULT_FORMAT):
+    return event_format.empty_scores()
+
+
+class ScoreStore:
+    """Score sheet shared by every session connected to the server.
+
+    `version` is bumped on every real change so that readers (e.g. the
+    clubhouse leaderboard display) can tell cheaply whether anything
+    needs to be recomputed. Each cell also remembers the version of its
+    last change, which drives conflict detection and the delta feed.
+    With a journal attached, `version` is the journal's sequence number,
+    so versions survive a restart.
+    """
+
+    # How many batch request ids are remembered for idempotent retries
+    REQUEST_ID_CAPACITY = 2000
+    # Device id used in version vectors for edits made on the server itself
+    SERVER_DEVICE = "server"
+
+    def __init__(self, event_format=DEFAULT_FORMAT):
+        self.event_format = event_format
+        self.scores = {}
+        self.version = 0
+        self.journal = None
+        # Changes whenever a new event starts, so devices know to drop their copy
+        self.event_id = uuid.uuid4().hex[:12]
+        # (player, round_key, hole_key) -> version of last change, oldest first
+        self._cell_versions = OrderedDict()
+        self._requests = OrderedDict()
+        # Offline sync: cell -> version vector {device: counter} and edit time
+        self._cell_clocks = {}
+        self._cell_times = {}
+        self.conflicts = deque(maxlen=500)
+        # Derived views (e.g. TeamBoard) kept up to date on every change;
+        # held weakly so evicted caches don't keep receiving updates
+        self._listeners = weakref.WeakSet()
+        self._lock = threading.RLock()
+
+    def subscribe(self, listener):
+        """Register an object with `load(scores)` and `on_score(player, round_key, hole_key, value)`"""
+        with self._lock:
+            listener.load(self.scores)
+            self._listeners.add(listener)
+
+    def attach_journal(self, journal):
+        """Record every subsequent change in `journal` (a ChangeJournal).
+
+        A journal that already holds changes (e.g. after a server restart)
+        is the source of truth: the sheet, and each cell's version, clock
+        and edit time, are rebuilt from it first.
+        """
+        with self._lock:
+            self.journal = journal
+            self.event_id = journal.event_id
+            if journal.seq:
+                for player, old_scores in journal.snapshot_at(journal.seq).items():
+                    self.scores[player] = self._reshaped(old_scores)
+                for change in journal.latest_changes():
+                    cell = (change.player, change.round_key, change.hole_key)
+                    if change.hole_key in self.scores.get(change.player, {}).get(change.round_key, {}):
+                        self._cell_versions[cell] = change.seq
+                        self._cell_clocks[cell] = change.clock
+                        self._cell_times[cell] = change.ts
+                self.version = journal.seq
+                for listener in list(self._listeners):
+                    listener.load(self.scores)
+            journal.checkpoint(self.scores, seq=self.version)
+
+    def ensure_player(self, player):
+        with self._lock:
+            if player not in self.scores:
+                # An empty sheet changes no reader's view, so the version stays
+                self.scores[player] = init_player_scores(self.event_format)
+
+    def reshape_losses(self, event_format):
+        """Entered scores that switching to `event_format` would break.
+
+        Returns two lists of (player, round_key, hole_key, score): scores on
+        holes the format doesn't have, and scores outside its score range.
+        """
+        with self._lock:
+            dropped, out_of_range = [], []
+            for player, rounds in self.scores.items():
+                for round_key, holes in rounds.items():
+                    round_number = int(round_key.split("_")[1])
+                    for hole_key, score in holes.items():
+                        if score is None:
+                            continue
+                        if (round_number > event_format.rounds
+                                or int(hole_key.split("_")[1]) > event_format.holes(round_number)):
+                            dropped.append((player, round_key, hole_key, score))
+                        elif not event_format.min_score <= score <= event_format.max_score:
+                            out_of_range.append((player, round_key, hole_key, score))
+            return dropped, out_of_range
+
+    def set_format(self, event_format, drop_scores=False):
+        """Reshape every player's sheet to `event_format`, keeping scores for holes that still exist.
+
+        Raises ValueError if entered scores fall outside the new score
+        range, or would be lost with their holes unless `drop_scores`.
+        """
+        with self._lock:
+            if event_format == self.event_format:
+                return
+            dropped, out_of_range = self.reshape_losses(event_format)
+            if out_of_range:
+                raise ValueError(f"{len(out_of_range)} entered scores are outside "
+                                 f"{event_format.min_score}-{event_format.max_score}")
+            if dropped and not drop_scores:
+                raise ValueError(f"{len(dropped)} entered scores are on holes the new format doesn't have")
+            self.event_format = event_format
+            for player, old_scores in self.scores.items():
+                self.scores[player] = self._reshaped(old_scores)
+            for cell in [cell for cell in self._cell_versions
+                         if cell[2] not in self.scores[cell[0]].get(cell[1], {})]:
+                del self._cell_versions[cell]
+                self._cell_clocks.pop(cell, None)
+                self._cell_times.pop(cell, None)
+            self.version += 1
+            for listener in list(self._listeners):
+                listener.load(self.scores)
+            if self.journal is not None:
+                # Undoing a change to a hole the new format dropped would fail
+                self.journal.prune_stacks(lambda player, round_key, hole_key:
+                                          hole_key in self.scores.get(player, {}).get(round_key, {}))
+                self.journal.checkpoint(self.scores, force=True, seq=self.version)
+
+    def start_event(self):
+        """Clear the sheet for the next event.
+
+        Every score, cell version, clock, sync conflict and remembered
+        request id is dropped and the journal is rotated (the old one is
+        kept in its archive). Returns the new event id.
+        """
+        with self._lock:
+            self.scores.clear()
+            self._cell_versions.clear()
+            self._cell_clocks.clear()
+            self._cell_times.clear()
+            self._requests.clear()
+            self.conflicts.clear()
+            self.version += 1
+            if self.journal is not None:
+                self.event_id = self.journal.rotate(self.scores, self.version)
+            else:
+                self.event_id = uuid.uuid4().hex[:12]
+            for listener in list(self._listeners):
+                listener.load(self.scores)
+            return self.event_id
+
+    def _reshaped(self, old_scores):
+        # A sheet in the current event format, keeping scores on holes that still exist
+        new_scores = self.event_format.empty_scores()
+        for round_key, holes in new_scores.items():
+            for hole_key in holes:
+                holes[hole_key] = old_scores.get(round_key, {}).get(hole_key)
+        return new_scores
+
+    def get(self, player, round_key, hole_key):
+        return self.scores[player][round_key][hole_key]
+
+    def snapshot(self):
+        """Copy of the whole sheet, for readers that iterate it outside the lock"""
+        with self._lock:
+            return {player: {round_key: dict(holes) for round_key, holes in rounds.items()}
+                    for player, rounds in self.scores.items()}
+
+    def set_score(self, player, round_key, hole_key, value, author=None, group=None, action="edit",
+                  clock=None, ts=None):
+        """Store a hole score; returns True if the sheet actually changed.
+
+        `clock`/`ts` are the version vector and edit time of a synced
+        offline edit; server-side edits advance the server's own entry.
+        """
+        with self._lock:
+            hole_scores = self.scores[player][round_key]
+            before = hole_scores[hole_key]
+            if before == value:
+                return False
+            hole_scores[hole_key] = value
+            self.version += 1
+            cell = (player, round_key, hole_key)
+            self._cell_versions[cell] = self.version
+            self._cell_versions.move_to_end(cell)
+            if clock is None:
+                clock = dict(self._cell_clocks.get(cell, {}))
+                clock[self.SERVER_DEVICE] = clock.get(self.SERVER_DEVICE, 0) + 1
+            self._cell_clocks[cell] = clock
+            self._cell_times[cell] = time.time() if ts is None else ts
+            for listener in list(self._listeners):
+                listener.on_score(player, round_key, hole_key, value)
+            if self.journal is not None:
+                self.journal.record(self.scores, author, group, player, round_key, hole_key,
+                                    before, value, action, clock, self._cell_times[cell])
+            return True
+
+    def undo(self, group, author=None):
+        """Revert the last change made in `group`.
+
+        Returns the undone Change, None if there is nothing to undo, or
+        False if the hole was changed again since (by another group, the
+        API or a sync); that entry is dropped rather than overwriting the
+        newer score.
+        """
+        with self._lock:
+            change = self.journal.pop_undo(group) if self.journal is not None else None
+            return self._revert(change, group, author, "undo")
+
+    def redo(self, group, author=None):
+        """Re-apply the last undone change in `group`; returns it, None or False like `undo`"""
+        with self._lock:
+            change = self.journal.pop_redo(group) if self.journal is not None else None
+            # The redo stack holds the undo entries, so restoring their "before" redoes
+            return self._revert(change, group, author, "redo")
+
+    def _revert(self, change, group, author, action):
+        if change is None:
+            return None
+        self.ensure_player(change.player)
+        if self.scores[change.player][change.round_key][change.hole_key] != change.after:
+            return False
+        self.set_score(change.player, change.round_key, change.hole_key,
+                       change.before, author, group, action=action)
+        return change
+
+    def apply_batch(self, updates, base_version=None, request_id=None, author=None, group=None):
+        """Apply many hole updates as one all-or-nothing change.
+
+        `updates` is a list of (player, round_key, hole_key, value). Unknown
+        cells raise KeyError before anything is applied. If `base_version`
+        is given and any of the cells was changed to a different value
+        after it, nothing is applied and the conflicting cells are
+        returned. Repeating a `request_id` returns the original result
+        without applying the batch again.
+        """
+        with self._lock:
+            if request_id is not None and request_id in self._requests:
+                return self._requests[request_id]
+
+            conflicts = []
+            for player, round_key, hole_key, value in updates:
+                current = self.scores[player][round_key][hole_key]
+                cell_version = self._cell_versions.get((player, round_key, hole_key), 0)
+                if base_version is not None and cell_version > base_version and current != value:
+                    conflicts.append({"player": player, "round": round_key, "hole": hole_key,
+                                      "value": value, "current": current, "version": cell_version})
+
+            applied = 0
+            if not conflicts:
+                with self._journal_batch():
+                    for player, round_key, hole_key, value in updates:
+                        applied += self.set_score(player, round_key, hole_key, value, author, group)
+
+            result = {"version": self.version, "applied": applied, "conflicts": conflicts}
+            if request_id is not None:
+                self._requests[request_id] = result
+                if len(self._requests) > self.REQUEST_ID_CAPACITY:
+                    self._requests.popitem(last=False)
+            return result
+
+    def changes_since(self, version):
+        """Latest value (and version vector) of every cell changed after `version`, oldest first"""
+        with self._lock:
+            changes = []
+            for cell, cell_version in reversed(self._cell_versions.items()):
+                if cell_version <= version:
+                    break
+                player, round_key, hole_key = cell
+                changes.append((player, round_key, hole_key, self.scores[player][round_key][hole_key],
+                                cell_version, self._cell_clocks.get(cell, {})))
+            changes.reverse()
+            return changes
+
+    def merge_batch(self, device, entries, request_id=None, author=None):
+        """Merge a queue of offline edits from `device` in one transaction.
+
+        `entries` is a list of (player, round_key, hole_key, value, clock, ts)
+        where `clock` is the device's version vector for the cell. Per cell:
+        an edit whose clock descends from the stored one is applied, one the
+        stored clock already covers is stale and dropped, and concurrent
+        edits are settled last-writer-wins on `ts` and recorded in
+        `conflicts` for review. Unknown cells raise KeyError before anything
+        is applied; a repeated `request_id` returns the original result.
+        """
+        with self._lock:
+            if request_id is not None and request_id in self._requests:
+                return self._requests[request_id]
+            # Raises KeyError for unknown cells before anything is changed
+            for player, round_key, hole_key, *_ in entries:
+                self.scores[player][round_key][hole_key]
+
+            conflicts = []
+            with self._journal_batch():
+                applied, stale = self._merge_entries(device, entries, author, conflicts)
+
+            result = {
+                "version": self.version, "applied": applied, "stale": stale, "conflicts": conflicts,
+                # Where every submitted cell ended up, so the device can refresh its copy
+                "cells": [(player, round_key, hole_key, self.scores[player][round_key][hole_key],
+                           self._cell_clocks.get((player, round_key, hole_key), {}))
+                          for player, round_key, hole_key, *_ in entries],
+            }
+            if request_id is not None:
+                self._requests[request_id] = result
+                if len(self._requests) > self.REQUEST_ID_CAPACITY:
+                    self._requests.popitem(last=False)
+            return result
+
+    def _journal_batch(self):
+        return self.journal.batch() if self.journal is not None else nullcontext()
+
+    def _merge_entries(self, device, entries, author, conflicts):
+        applied = stale = 0
+        for player, round_key, hole_key, value, clock, ts in entries:
+            cell = (player, round_key, hole_key)
+            stored = self._cell_clocks.get(cell, {})
+            devices = stored.keys() | clock.keys()
+            incoming_newer = any(clock.get(d, 0) > stored.get(d, 0) for d in devices)
+            stored_newer = any(stored.get(d, 0) > clock.get(d, 0) for d in devices)
+            merged = {d: max(clock.get(d, 0), stored.get(d, 0)) for d in devices}
+
+            if not incoming_newer:
+                stale += 1
+                continue
+            current = self.scores[player][round_key][hole_key]
+            if stored_newer and current != value:
+                incoming_wins = ts > self._cell_times.get(cell, 0)
+                conflict = {"player": player, "round": round_key, "hole": hole_key,
+                            "server_value": current, "device_value": value, "device": device,
+                            "kept": value if incoming_wins else current, "ts": ts}
+                conflicts.append(conflict)
+                self.conflicts.append(conflict)
+                if not incoming_wins:
+                    # Keep the server value but remember the device's edit was seen
+                    self._cell_clocks[cell] = merged
+                    continue
+            applied += self.set_score(player, round_key, hole_key, value, author or device,
+                                      action="sync", clock=merged, ts=ts)
+            self._cell_clocks[cell] = merged
+        return applied, stale
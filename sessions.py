@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate number of bytes held by `obj` and everything it references"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class SessionRoster(Mapping):
+    """A session's view of the member list.
+
+    The roster loaded from the workbook is shared, read-only, by every
+    session; this only stores what the session changed on top of it
+    (members marked unavailable, added and removed members).
+    """
+
+    def __init__(self, roster, unavailable=(), added=None, removed=()):
+        self._roster = roster
+        self.unavailable = set(unavailable)
+        self.added = dict(added or {})
+        self.removed = set(removed)
+
+    def __getitem__(self, name):
+        if name in self.added:
+            gender = self.added[name]
+            divisions = {"Gender": gender}
+        elif name in self._roster and name not in self.removed:
+            gender = self._roster[name]["gender"]
+            divisions = self._roster[name]["divisions"]
+        else:
+            raise KeyError(name)
+        return {"available": name not in self.unavailable, "gender": gender, "divisions": divisions}
+
+    def __iter__(self):
+        for name in self._roster:
+            if name not in self.removed:
+                yield name
+        yield from self.added
+
+    def __len__(self):
+        return len(self._roster) - len(self.removed) + len(self.added)
+
+    def __contains__(self, name):
+        return name in self.added or (name in self._roster and name not in self.removed)
+
+    def set_available(self, name, available):
+        if available:
+            self.unavailable.discard(name)
+        else:
+            self.unavailable.add(name)
+
+    def add(self, name, gender):
+        if name in self._roster:
+            self.removed.discard(name)
+        else:
+            self.added[name] = gender
+
+    def remove(self, name):
+        self.added.pop(name, None)
+        self.unavailable.discard(name)
+        if name in self._roster:
+            self.removed.add(name)
+
+    def deltas(self):
+        return {"unavailable": sorted(self.unavailable), "added": self.added,
+                "removed": sorted(self.removed)}
+
+
+class SessionData:
+    """Everything one browser session needs to keep between reruns"""
+
+    def __init__(self, roster, state=None):
+        state = state or {}
+        self.members = SessionRoster(roster, state.get("unavailable", ()),
+                                     state.get("added"), state.get("removed", ()))
+        self.groups = state.get("groups", [])
+        self.last_seen = time.time()
+
+    def to_dict(self):
+        return dict(self.members.deltas(), groups=self.groups)
+
+    def nbytes(self):
+        # The shared roster is not counted; it is held once per server
+        return deep_sizeof(self.to_dict())
+
+
+class SessionRegistry:
+    """Per-session state for every connected browser, with idle eviction.
+
+    Sessions idle for longer than `idle_seconds` are written to
+    `<directory>/<sid>.json` and dropped from memory; the next request
+    carrying the same `sid` loads them back transparently (and deletes
+    the file). Files nobody came back for within `expire_seconds` are
+    removed.
+    """
+
+    def __init__(self, roster, directory, idle_seconds=1800, sweep_every=60, expire_seconds=30 * 86400):
+        os.makedirs(directory, exist_ok=True)
+        self.roster = roster
+        self.directory = directory
+        self.idle_seconds = idle_seconds
+        self.sweep_every = sweep_every
+        self.expire_seconds = expire_seconds
+        self.evicted = 0
+        self._active = {}
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+
+    def _path(self, sid):
+        return os.path.join(self.directory, f"{sid}.json")
+
+    def checkout(self, sid):
+        """Return the session's data, restoring it from disk if it was evicted"""
+        with self._lock:
+            session = self._active.get(sid)
+            if session is None:
+                state = None
+                if os.path.exists(self._path(sid)):
+                    with open(self._path(sid), encoding="utf-8") as f:
+                        state = json.load(f)
+                    # Back in memory; it is written again if it goes idle
+                    os.remove(self._path(sid))
+                session = self._active[sid] = SessionData(self.roster, state)
+            session.last_seen = time.time()
+            if session.last_seen - self._last_sweep > self.sweep_every:
+                self._evict_idle(session.last_seen)
+            return session
+
+    def _evict_idle(self, now):
+        self._last_sweep = now
+        for sid, session in list(self._active.items()):
+            if now - session.last_seen > self.idle_seconds:
+                with open(self._path(sid), "w", encoding="utf-8") as f:
+                    json.dump(session.to_dict(), f, ensure_ascii=False)
+                del self._active[sid]
+                self.evicted += 1
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".json") and now - os.path.getmtime(path) > self.expire_seconds:
+                os.remove(path)
+
+    def stats(self):
+        """(session label, bytes, idle seconds) for every session currently in memory.
+
+        The sid in the URL is the only key to a session, so only a short
+        hash of it is shown.
+        """
+        now = time.time()
+        with self._lock:
+            return [(hashlib.sha256(sid.encode("utf-8")).hexdigest()[:8], session.nbytes(),
+                     int(now - session.last_seen))
+                    for sid, session in self._active.items()]
@@ -0,0 +1,97 @@
+import importlib
+import sys
+import threading
+import time
+
+# When this module was first imported, i.e. the first script run after a
+# (re)start; cold-start timings are measured from here
+PROCESS_START = time.time()
+
+
+# Deferred imports may be triggered from the prewarm thread, API threads and
+# script runs at the same time; only one of them performs the import
+_import_lock = threading.Lock()
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_import(name):
+    """Return module `name`, deferring the actual import until first attribute access.
+
+    Unlike importlib's LazyLoader this never puts a half-initialised module
+    into sys.modules, so it is safe when several threads touch it at once.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+class StartupMetrics:
+    """Time-to-first-paint samples (seconds from script start to the rendered shell)"""
+
+    def __init__(self, max_samples=200):
+        self.cold_first_paint = None
+        self.samples = []
+        self.max_samples = max_samples
+        self.prewarm_seconds = {}
+        self._lock = threading.Lock()
+
+    def record_first_paint(self, run_started):
+        now = time.time()
+        with self._lock:
+            if self.cold_first_paint is None:
+                # The very first run also pays for module imports since restart
+                self.cold_first_paint = now - PROCESS_START
+            self.samples.append(now - run_started)
+            del self.samples[:-self.max_samples]
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            return {
+                "cold": self.cold_first_paint,
+                "median": samples[len(samples) // 2] if samples else None,
+                "runs": len(samples),
+                "prewarm": dict(self.prewarm_seconds),
+            }
+
+
+def prewarm(tasks, metrics=None):
+    """Run `tasks` ({name: callable}) one after another on a daemon thread.
+
+    Used to fill the roster/history caches and import heavy modules in the
+    background so the first user to open a section doesn't wait for them.
+    Failures are ignored; the section will simply load on first use.
+    """
+    def run():
+        for name, task in tasks.items():
+            started = time.time()
+            try:
+                task()
+            except Exception:
+                continue
+            if metrics is not None:
+                metrics.prewarm_seconds[name] = round(time.time() - started, 3)
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
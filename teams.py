@@ -0,0 +1,123 @@
+from startup import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+TEAM_FORMATS = ["Best Ball", "Scramble", "Aggregate", "Best N of M"]
+
+
+def reduce_team_scores(cells, sizes, team_format, best_n=2):
+    """Per-hole team scores from member scores.
+
+    `cells` has shape (teams, members, ...) with NaN for missing scores and
+    for padding in smaller teams; `sizes` holds the real member count of
+    each team. Returns an array of shape (teams, ...) with NaN where the
+    hole is not complete yet for that format.
+
+    - Best Ball: lowest member score on the hole
+    - Scramble: the team plays one ball, recorded on the captain's (first
+      member's) card
+    - Aggregate: sum of every member's score
+    - Best N of M: sum of the N lowest member scores
+    """
+    extra_dims = (None,) * (cells.ndim - 2)
+    counts = np.sum(~np.isnan(cells), axis=1)
+
+    if team_format == "Best Ball":
+        need = 1
+        result = np.fmin.reduce(cells, axis=1)
+    elif team_format == "Scramble":
+        need = 1
+        result = cells[:, 0]
+        counts = (~np.isnan(result)).astype(int)
+    elif team_format == "Aggregate":
+        need = sizes[(slice(None),) + extra_dims]
+        result = np.nansum(cells, axis=1)
+    elif team_format == "Best N of M":
+        need = np.minimum(best_n, sizes)[(slice(None),) + extra_dims]
+        # NaN sorts last, so the first N entries are the N best recorded scores
+        result = np.nansum(np.sort(cells, axis=1)[:, :best_n], axis=1)
+    else:
+        raise ValueError(f"Unknown team format: {team_format}")
+
+    return np.where(counts >= need, result, np.nan)
+
+
+class TeamBoard:
+    """Team scores for one team definition and format, kept in sync with a ScoreStore.
+
+    Member scores live in a (teams, members, rounds, holes) array. A full
+    `load` reduces every team and hole in one vectorized pass; afterwards
+    each `on_score` only re-reduces the single hole that changed.
+    """
+
+    def __init__(self, teams, team_format, best_n=2, rounds=4, holes=9, par=3):
+        # `rounds`/`holes`/`par` come from the event format (holes = the longest round)
+        self.teams = [tuple(team) for team in teams]
+        self.team_format = team_format
+        self.best_n = best_n
+        self.sizes = np.array([len(team) for team in self.teams], dtype=int)
+        # Par of one team hole: one ball counts for Best Ball/Scramble, N or all for the others
+        if team_format == "Aggregate":
+            self.hole_par = par * self.sizes
+        elif team_format == "Best N of M":
+            self.hole_par = par * np.minimum(best_n, self.sizes)
+        else:
+            self.hole_par = np.full(len(self.teams), par)
+        max_size = int(self.sizes.max()) if len(self.teams) else 0
+        self.member_scores = np.full((len(self.teams), max_size, rounds, holes), np.nan)
+        self.team_scores = np.full((len(self.teams), rounds, holes), np.nan)
+        # player -> [(team index, member index), ...]
+        self._index = {}
+        for t, team in enumerate(self.teams):
+            for m, player in enumerate(team):
+                self._index.setdefault(player, []).append((t, m))
+
+    def load(self, scores):
+        self.member_scores[:] = np.nan
+        for player, positions in self._index.items():
+            for round_key, holes in scores.get(player, {}).items():
+                r = int(round_key.split("_")[1]) - 1
+                if r >= self.team_scores.shape[1]:
+                    continue
+                for hole_key, value in holes.items():
+                    h = int(hole_key.split("_")[1]) - 1
+                    if value is not None and h < self.team_scores.shape[2]:
+                        for t, m in positions:
+                            self.member_scores[t, m, r, h] = value
+        if len(self.teams):
+            self.team_scores = reduce_team_scores(self.member_scores, self.sizes,
+                                                  self.team_format, self.best_n)
+
+    def on_score(self, player, round_key, hole_key, value):
+        positions = self._index.get(player)
+        if not positions:
+            return
+        r = int(round_key.split("_")[1]) - 1
+        h = int(hole_key.split("_")[1]) - 1
+        if r >= self.team_scores.shape[1] or h >= self.team_scores.shape[2]:
+            # A board built for an older event format; it is replaced on next use
+            return
+        for t, m in positions:
+            self.member_scores[t, m, r, h] = np.nan if value is None else value
+            self.team_scores[t, r, h] = reduce_team_scores(
+                self.member_scores[t:t+1, :, r, h], self.sizes[t:t+1],
+                self.team_format, self.best_n)[0]
+
+    def standings(self, team_names=None):
+        """Ranked team leader board (lowest score to par for the holes completed first)"""
+        round_totals = np.nansum(self.team_scores, axis=2)
+        holes_done = np.sum(~np.isnan(self.team_scores), axis=(1, 2))
+        board = pd.DataFrame({
+            "Team": team_names or [f"Team {t+1}" for t in range(len(self.teams))],
+            "Members": [", ".join(team) for team in self.teams],
+        })
+        for r in range(round_totals.shape[1]):
+            board[f"Round {r+1} Total"] = round_totals[:, r].astype(int)
+        board["Overall Total"] = round_totals.sum(axis=1).astype(int)
+        board["Holes"] = holes_done
+        board["To Par"] = board["Overall Total"] - self.hole_par * holes_done
+        board = board[board["Holes"] > 0].copy()
+        board.insert(0, "Rank", board["To Par"].rank(method="min").astype(int))
+        board["_holes"] = -board["Holes"]
+        return board.sort_values(["Rank", "_holes", "Team"]).drop(columns="_holes").reset_index(drop=True)
@@ -0,0 +1,102 @@
+import pytest
+
+from event_format import EventFormat
+from journal import ChangeJournal
+from score_store import ScoreStore
+
+
+def recorded(scores):
+    """Only the holes that hold a score; snapshots before the first checkpoint are sparse"""
+    return {(player, round_key, hole_key): score
+            for player, rounds in scores.items()
+            for round_key, holes in rounds.items()
+            for hole_key, score in holes.items() if score is not None}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScoreStore()
+    store.attach_journal(ChangeJournal(tmp_path, checkpoint_every=3))
+    for player in ("Kim", "Lee"):
+        store.ensure_player(player)
+    return store
+
+
+def test_snapshot_at_matches_every_past_state(store, tmp_path):
+    states = {}
+    for hole, score in enumerate([3, 4, 2, 5, 3, 4, 6], 1):
+        store.set_score("Kim", "round_1", f"hole_{hole}", score, group=0)
+        store.set_score("Kim", "round_1", "hole_1", score, group=0)
+        states[store.journal.seq] = recorded(store.scores)
+
+    # Several checkpoints were written; every state is rebuilt from the nearest one
+    assert len(store.journal._checkpoints) > 2
+    for seq, scores in states.items():
+        assert recorded(store.journal.snapshot_at(seq)) == scores
+
+    reopened = ChangeJournal(tmp_path, checkpoint_every=3)
+    for seq, scores in states.items():
+        assert recorded(reopened.snapshot_at(seq)) == scores
+
+
+def test_undo_and_redo_walk_a_group_back_and_forth(store):
+    store.set_score("Kim", "round_1", "hole_1", 3, group=0)
+    store.set_score("Kim", "round_1", "hole_1", 4, group=0)
+
+    assert store.undo(0).after == 4
+    assert store.get("Kim", "round_1", "hole_1") == 3
+    assert store.undo(0).after == 3
+    assert store.get("Kim", "round_1", "hole_1") is None
+    assert store.undo(0) is None
+
+    store.redo(0)
+    store.redo(0)
+    assert store.get("Kim", "round_1", "hole_1") == 4
+    assert store.redo(0) is None
+
+
+def test_new_edit_clears_redo(store):
+    store.set_score("Kim", "round_1", "hole_1", 3, group=0)
+    store.undo(0)
+    store.set_score("Kim", "round_1", "hole_2", 5, group=0)
+    assert not store.journal.can_redo(0)
+
+
+def test_undo_never_overwrites_a_later_edit(store):
+    store.set_score("Lee", "round_1", "hole_1", 3, group=0)
+    store.set_score("Lee", "round_1", "hole_1", 5, group=1)
+
+    assert store.undo(0) is False
+    assert store.get("Lee", "round_1", "hole_1") == 5
+    assert not store.journal.can_undo(0)
+
+    assert store.undo(1).after == 5
+    store.set_score("Lee", "round_1", "hole_1", 4, group=0)
+    assert store.redo(1) is False
+    assert store.get("Lee", "round_1", "hole_1") == 4
+
+
+def test_reopened_journal_keeps_the_version_of_a_reshape(store, tmp_path):
+    store.set_score("Kim", "round_1", "hole_1", 3, group=0)
+    store.set_format(EventFormat([18, 18]))
+    assert store.version == store.journal.seq
+
+    restarted = ScoreStore(EventFormat([18, 18]))
+    restarted.attach_journal(ChangeJournal(tmp_path, checkpoint_every=3))
+    assert restarted.version == store.version
+    assert restarted.get("Kim", "round_1", "hole_1") == 3
+
+
+def test_start_event_clears_the_sheet_and_rotates_the_journal(store, tmp_path):
+    store.set_score("Kim", "round_1", "hole_1", 3, group=0)
+    old_event, old_version = store.event_id, store.version
+
+    assert store.start_event() != old_event
+    assert store.scores == {} and store.changes_since(0) == []
+    assert store.version > old_version and not store.journal.can_undo(0)
+    assert (tmp_path / "archive" / old_event / "journal.jsonl").exists()
+
+    restarted = ScoreStore()
+    restarted.attach_journal(ChangeJournal(tmp_path, checkpoint_every=3))
+    assert restarted.scores == {}
+    assert (restarted.event_id, restarted.version) == (store.event_id, store.version)
@@ -0,0 +1,177 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from journal import ChangeJournal
+from score_api import start_api_server
+from score_store import ScoreStore
+
+
+def serve(store):
+    server = start_api_server(store, host="127.0.0.1", port=0)
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api():
+    store = ScoreStore()
+    for player in ("Kim", "Lee"):
+        store.ensure_player(player)
+    server, base = serve(store)
+    yield store, base
+    stop(server)
+
+
+def call(url, payload=None):
+    """(status, JSON body) of a GET, or of a POST when `payload` is given"""
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_repeated_request_id_is_applied_once(api):
+    store, base = api
+    payload = {"request_id": "r1", "updates": [{"player": "Kim", "round": 1, "hole": 1, "score": 3}]}
+    status, first = call(base + "/scores", payload)
+    assert status == 200 and first["applied"] == 1
+
+    store.set_score("Kim", "round_1", "hole_1", 5)
+    status, second = call(base + "/scores", payload)
+    assert status == 200 and second == first
+    assert store.get("Kim", "round_1", "hole_1") == 5
+
+
+def test_base_version_conflict_returns_409(api):
+    store, base = api
+    base_version = store.version
+    store.set_score("Kim", "round_1", "hole_2", 4)
+
+    status, result = call(base + "/scores", {"base_version": base_version, "updates": [
+        {"player": "Kim", "round": 1, "hole": 2, "score": 6},
+        {"player": "Lee", "round": 1, "hole": 2, "score": 3},
+    ]})
+    assert status == 409
+    assert result["applied"] == 0
+    assert [(c["player"], c["hole"], c["current"]) for c in result["conflicts"]] == [("Kim", "hole_2", 4)]
+    assert store.get("Lee", "round_1", "hole_2") is None
+
+
+def test_invalid_group_is_rejected(api):
+    store, base = api
+    status, result = call(base + "/scores", {"group": "front", "updates": [
+        {"player": "Kim", "round": 1, "hole": 1, "score": 3}]})
+    assert status == 400
+    assert store.get("Kim", "round_1", "hole_1") is None
+
+
+def test_non_json_posts_are_rejected(api):
+    store, base = api
+    request = urllib.request.Request(base + "/scores", headers={"Content-Type": "text/plain"}, data=json.dumps(
+        {"updates": [{"player": "Kim", "round": 1, "hole": 1, "score": 3}]}).encode("utf-8"))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+    assert error.value.code == 415
+    assert "Access-Control-Allow-Origin" not in error.value.headers
+    assert store.get("Kim", "round_1", "hole_1") is None
+
+
+def test_changes_since_returns_only_later_cells(api):
+    store, base = api
+    store.set_score("Kim", "round_1", "hole_1", 3)
+    since = store.version
+    store.set_score("Lee", "round_2", "hole_5", 4)
+    store.set_score("Kim", "round_1", "hole_1", 2)
+
+    status, result = call(f"{base}/changes?since={since}")
+    assert status == 200 and result["version"] == store.version and not result["reset"]
+    assert [change[:4] for change in result["changes"]] == [
+        ["Lee", "round_2", "hole_5", 4], ["Kim", "round_1", "hole_1", 2]]
+
+    status, result = call(f"{base}/changes?since={store.version}")
+    assert result["changes"] == []
+
+
+def test_sync_applies_drops_stale_and_settles_conflicts(api):
+    store, base = api
+
+    def entry(hole, score, clock, ts):
+        return {"player": "Kim", "round": 1, "hole": hole, "score": score, "clock": clock, "ts": ts}
+
+    status, result = call(base + "/sync", {"request_id": "s1", "device": "phone", "entries": [
+        entry(1, 3, {"phone": 1}, 100.0)]})
+    assert status == 200 and result["applied"] == 1 and result["stale"] == 0
+    assert store.get("Kim", "round_1", "hole_1") == 3
+
+    # Same clock again from a new batch: already covered by the server
+    status, result = call(base + "/sync", {"request_id": "s2", "device": "phone", "entries": [
+        entry(1, 3, {"phone": 1}, 100.0)]})
+    assert result["applied"] == 0 and result["stale"] == 1
+
+    # Concurrent edits of one cell: the later edit wins and the conflict is reported
+    store.set_score("Kim", "round_1", "hole_2", 4)
+    server_ts = store._cell_times[("Kim", "round_1", "hole_2")]
+    status, result = call(base + "/sync", {"request_id": "s3", "device": "phone", "entries": [
+        entry(2, 6, {"phone": 1}, server_ts + 10)]})
+    assert result["applied"] == 1
+    assert [(c["server_value"], c["device_value"], c["kept"]) for c in result["conflicts"]] == [(4, 6, 6)]
+    assert store.get("Kim", "round_1", "hole_2") == 6
+
+
+def test_versions_survive_a_restart(tmp_path):
+    store = ScoreStore()
+    store.attach_journal(ChangeJournal(tmp_path))
+    store.ensure_player("Kim")
+    server, base = serve(store)
+    call(base + "/scores", {"updates": [{"player": "Kim", "round": 1, "hole": 1, "score": 3}]})
+    _, seen = call(base + "/version")
+    call(base + "/scores", {"updates": [{"player": "Kim", "round": 1, "hole": 2, "score": 4}]})
+    _, before = call(base + "/changes?since=0")
+    stop(server)
+
+    restarted = ScoreStore()
+    restarted.attach_journal(ChangeJournal(tmp_path))
+    server, base = serve(restarted)
+    try:
+        _, after = call(base + "/changes?since=0")
+        assert after == before
+        # A device that saw the first edit still gets exactly the second one
+        _, delta = call(f"{base}/changes?since={seen['version']}")
+        assert not delta["reset"]
+        assert [change[:4] for change in delta["changes"]] == [["Kim", "round_1", "hole_2", 4]]
+        # ...and its stale base_version is still detected
+        status, result = call(base + "/scores", {"base_version": seen["version"], "updates": [
+            {"player": "Kim", "round": 1, "hole": 2, "score": 6}]})
+        assert status == 409 and result["conflicts"][0]["current"] == 4
+    finally:
+        stop(server)
+
+
+def test_sync_conflicts_are_still_detected_after_a_restart(tmp_path):
+    store = ScoreStore()
+    store.attach_journal(ChangeJournal(tmp_path))
+    store.ensure_player("Kim")
+    store.set_score("Kim", "round_1", "hole_1", 4)
+
+    restarted = ScoreStore()
+    restarted.attach_journal(ChangeJournal(tmp_path))
+    server, base = serve(restarted)
+    try:
+        # Concurrent with the server edit but older: the server value stays
+        status, result = call(base + "/sync", {"device": "phone", "entries": [
+            {"player": "Kim", "round": 1, "hole": 1, "score": 6, "clock": {"phone": 1}, "ts": 0}]})
+        assert status == 200 and result["applied"] == 0
+        assert [(c["server_value"], c["kept"]) for c in result["conflicts"]] == [(4, 4)]
+        assert restarted.get("Kim", "round_1", "hole_1") == 4
+    finally:
+        stop(server)